@@ -0,0 +1,180 @@
+import csv
+import logging
+import os
+import tempfile
+
+from sqlalchemy.orm import Session
+
+from app.database import FACT_MODEL
+
+logger = logging.getLogger(__name__)
+
+
+class ORMBatchLoader:
+    """Oddiy ORM yo'li (bulk_insert_mappings) - har qanday database uchun fallback"""
+
+    name = "orm"
+    # row_hash unique - mavjud qatorlar jimgina o'tkazib yuboriladi
+    insert_prefix = "INSERT"
+
+    def __init__(self, engine, model=None):
+        self.engine = engine
+        # Yoziladigan jadval: flat - trade_records, star - trade_facts
+        self.model = model or FACT_MODEL
+
+    def load(self, columns: dict, delta=None) -> int:
+        """Ustunli batch ni yozish, yozilgan (yangi) qatorlar sonini qaytaradi
+
+        delta - rollups.BatchDelta: insert tranzaksiyasi ichida yozilgan qatorlar delta sini hisoblaydi.
+        """
+        keys = list(columns)
+        records = [dict(zip(keys, row)) for row in zip(*columns.values())]
+        if not records:
+            return 0
+
+        db = Session(self.engine)
+        try:
+            if delta:
+                delta.before_insert(db.connection())
+            # Dublikatlarni batch ichida va database dagi row_hash bo'yicha olib tashlash
+            unique = {}
+            for record in records:
+                unique.setdefault(record.get('row_hash'), record)
+            existing = {
+                h for (h,) in db.query(self.model.row_hash)
+                .filter(self.model.row_hash.in_([h for h in unique if h]))
+            }
+            records = [r for h, r in unique.items() if h not in existing]
+
+            db.bulk_insert_mappings(self.model, records)
+            if delta:
+                delta.after_insert(db.connection(), len(records))
+            db.commit()
+            return len(records)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def insert_sql(self, keys) -> str:
+        placeholder = '?' if self.engine.dialect.paramstyle == 'qmark' else '%s'
+        return (
+            f"{self.insert_prefix} INTO {self.model.__tablename__} ({', '.join(keys)}) "
+            f"VALUES ({', '.join([placeholder] * len(keys))})"
+        )
+
+
+class SQLiteBatchLoader(ORMBatchLoader):
+    """SQLite: bitta tranzaksiyada executemany, yuklash vaqtida tezlashtirilgan PRAGMA lar"""
+
+    name = "sqlite"
+    insert_prefix = "INSERT OR IGNORE"
+
+    # Yuklash vaqtidagi PRAGMA lar (connection ga qaytarishda tiklanadi)
+    LOAD_PRAGMAS = {
+        "synchronous": "OFF",
+        "temp_store": "MEMORY",
+        "cache_size": "-131072",  # ~128MB
+    }
+
+    def load(self, columns: dict, delta=None) -> int:
+        rows = list(zip(*columns.values()))
+        if not rows:
+            return 0
+
+        with self.engine.connect() as conn:
+            # Eski qiymatlarni saqlab, yuklash PRAGMA larini qo'yish
+            previous = {
+                pragma: conn.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+                for pragma in self.LOAD_PRAGMAS
+            }
+            for pragma, value in self.LOAD_PRAGMAS.items():
+                conn.exec_driver_sql(f"PRAGMA {pragma} = {value}")
+            conn.commit()
+
+            try:
+                with conn.begin():
+                    if delta:
+                        delta.before_insert(conn)
+                    result = conn.exec_driver_sql(self.insert_sql(columns), rows)
+                    # Dublikat (IGNORE) qatorlar rowcount ga kirmaydi
+                    if delta:
+                        delta.after_insert(conn, result.rowcount)
+            finally:
+                for pragma, value in previous.items():
+                    conn.exec_driver_sql(f"PRAGMA {pragma} = {value}")
+                conn.commit()
+
+        # Dublikat (IGNORE) qatorlar rowcount ga kirmaydi
+        return result.rowcount
+
+
+class MySQLBatchLoader(ORMBatchLoader):
+    """MySQL: vaqtinchalik CSV + LOAD DATA LOCAL INFILE, bo'lmasa multi-row INSERT"""
+
+    name = "mysql"
+    insert_prefix = "INSERT IGNORE"
+
+    def __init__(self, engine, model=None):
+        super().__init__(engine, model)
+        # Server local_infile ni o'chirgan bo'lsa, keyingi batch larda urinmaslik
+        self.load_data_enabled = True
+
+    def load(self, columns: dict, delta=None) -> int:
+        rows = list(zip(*columns.values()))
+        if not rows:
+            return 0
+
+        if self.load_data_enabled:
+            try:
+                return self.load_data_infile(columns, rows, delta)
+            except Exception as e:
+                self.load_data_enabled = False
+                logger.warning(f"⚠️ LOAD DATA LOCAL INFILE ishlamadi, multi-row INSERT ga o'tildi: {e}")
+
+        # pymysql executemany INSERT ... VALUES ni multi-row so'rovlarga birlashtiradi
+        with self.engine.begin() as conn:
+            if delta:
+                delta.before_insert(conn)
+            result = conn.exec_driver_sql(self.insert_sql(columns), rows)
+            if delta:
+                delta.after_insert(conn, result.rowcount)
+        return result.rowcount
+
+    def load_data_infile(self, columns: dict, rows: list, delta=None) -> int:
+        fd, csv_path = tempfile.mkstemp(suffix=".csv", prefix="trade_batch_")
+        try:
+            with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f, lineterminator="\n")
+                writer.writerows(rows)
+
+            load_sql = (
+                f"LOAD DATA LOCAL INFILE '{csv_path}' "
+                f"IGNORE INTO TABLE {self.model.__tablename__} "
+                "CHARACTER SET utf8mb4 "
+                "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+                "LINES TERMINATED BY '\\n' "
+                f"({', '.join(columns)})"
+            )
+            with self.engine.begin() as conn:
+                if delta:
+                    delta.before_insert(conn)
+                result = conn.exec_driver_sql(load_sql)
+                if delta:
+                    delta.after_insert(conn, result.rowcount)
+            return result.rowcount
+        finally:
+            os.remove(csv_path)
+
+
+def get_batch_loader(engine, kind: str = "auto") -> ORMBatchLoader:
+    """Database dialect iga mos loader ni tanlash"""
+    loaders = {
+        "orm": ORMBatchLoader,
+        "sqlite": SQLiteBatchLoader,
+        "mysql": MySQLBatchLoader,
+    }
+    if kind == "auto":
+        kind = engine.dialect.name if engine.dialect.name in loaders else "orm"
+    return loaders[kind](engine)
@@ -0,0 +1,113 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Eksport formatlari: fayl kengaytmasi va media type
+COLUMNAR_FORMATS = {
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    # Arrow IPC stream - har batch o'z dictionary sini olib yura oladi
+    "arrow": ("arrows", "application/vnd.apache.arrow.stream"),
+}
+
+# Bitta row group / record batch dagi qatorlar
+ROW_GROUP_ROWS = 65536
+
+# (ustun nomi, tur) - main.EXPORT_COLUMNS tartibida
+FIELDS = (
+    ("trading_partner", "dictionary"),
+    ("product_name", "string"),
+    ("hs_10_code", "string"),
+    ("year", "int32"),
+    ("import_volume", "float64"),
+    ("import_price", "float64"),
+    ("export_volume", "float64"),
+    ("export_price", "float64"),
+    ("measure", "dictionary"),
+    ("hs_group", "dictionary"),
+)
+
+
+def arrow_schema():
+    """Eksport sxemasi - kam qiymatli matn ustunlari dictionary<int32, string>"""
+    import pyarrow as pa
+
+    types = {
+        "dictionary": pa.dictionary(pa.int32(), pa.string()),
+        "string": pa.string(),
+        "int32": pa.int32(),
+        "float64": pa.float64(),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in FIELDS])
+
+
+def rows_to_batch(rows, schema):
+    """Query qatorlari (tuple) dan RecordBatch yasash"""
+    import pyarrow as pa
+
+    columns = list(zip(*rows)) if rows else [()] * len(FIELDS)
+    arrays = []
+    for values, (name, kind) in zip(columns, FIELDS):
+        if kind == "dictionary":
+            arrays.append(pa.array(values, pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, schema.field(name).type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class ChunkSink:
+    """Writer yozgan baytlarni yig'ib, generator ga bo'lak-bo'lak berish uchun fayl"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_columnar_export(partitions, fmt: str):
+    """Qator bo'laklarini Parquet yoki Arrow IPC baytlariga aylantirib oqim sifatida berish"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema()
+    sink = ChunkSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="snappy")
+        write = writer.write_batch
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+        write = writer.write_batch
+
+    batches = 0
+    try:
+        for rows in partitions:
+            write(rows_to_batch(rows, schema))
+            batches += 1
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+
+    # Footer (Parquet) / end-of-stream marker (Arrow)
+    yield sink.drain()
+    logger.info(f"📦 {fmt} eksport: {batches} ta batch")
@@ -0,0 +1,237 @@
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import func, text
+
+from app import rollups
+from app.database import (
+    TradeRecord, FACT_MODEL, DedupeState, NATURAL_KEY_COLUMNS,
+    row_hashes, get_db_type, env_int, bump_data_version
+)
+
+logger = logging.getLogger(__name__)
+
+# Bitta tranzaksiyada tekshiriladigan / o'chiriladigan qatorlar - qulf qisqa bo'lishi uchun
+DEDUPE_CHUNK_SIZE = env_int("DEDUPE_CHUNK_SIZE", 5000)
+
+KEY_COLUMNS = [getattr(TradeRecord, col) for col in NATURAL_KEY_COLUMNS]
+# O'chiriladigan qatorlarning rollup lardan ayiriladigan ustunlari
+ROLLUP_COLUMNS = [getattr(TradeRecord, col) for col in ('year', 'trading_partner', 'hs_2_code') + rollups.MEASURES]
+
+# dedupe_state dagi yagona qator
+STATE_ID = 1
+
+# Bir vaqtda faqat bitta tozalash
+_lock = threading.Lock()
+
+
+class DedupeProgress:
+    """Joriy yoki oxirgi dublikat tozalash holati"""
+
+    def __init__(self):
+        self.status = "idle"        # idle | running | completed | failed
+        self.pending_rows = None    # watermark dan keyin tekshirilishi kerak bo'lgan qatorlar
+        self.rows_checked = 0
+        self.removed = 0
+        self.chunks = 0
+        self.last_checked_id = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self, pending_rows: int, last_checked_id: int):
+        self.__init__()
+        self.status = "running"
+        self.pending_rows = pending_rows
+        self.last_checked_id = last_checked_id
+        self.started_at = time.time()
+
+    def finish(self, status: str, error: str = None):
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+
+    def to_dict(self) -> dict:
+        progress = None
+        if self.pending_rows:
+            progress = round(min(self.rows_checked / self.pending_rows, 1.0) * 100, 1)
+        if self.status == "completed":
+            progress = 100.0
+        end = self.finished_at or time.time()
+
+        return {
+            "status": self.status,
+            "pending_rows": self.pending_rows,
+            "rows_checked": self.rows_checked,
+            "removed_count": self.removed,
+            "chunks": self.chunks,
+            "progress": progress,
+            "last_checked_id": self.last_checked_id,
+            "elapsed_seconds": round(end - self.started_at, 2) if self.started_at else 0,
+            "error": self.error,
+        }
+
+
+progress = DedupeProgress()
+
+
+def get_watermark(db) -> int:
+    state = db.get(DedupeState, STATE_ID)
+    return state.last_checked_id if state else 0
+
+
+def set_watermark(db, last_id: int):
+    db.merge(DedupeState(id=STATE_ID, last_checked_id=last_id, checked_at=datetime.utcnow()))
+
+
+def clamp_to_max_id(db, last_id: int) -> int:
+    """SQLite oxirgi id lar o'chirilsa ularni qayta beradi - watermark mavjud eng katta id dan oshmasin"""
+    return min(last_id, db.query(func.max(TradeRecord.id)).scalar() or 0)
+
+
+def clear(db):
+    """Barcha ma'lumot o'chirilganda - id lar qaytadan boshlanishi mumkin"""
+    set_watermark(db, 0)
+
+
+def count_pending(db, after_id: int) -> int:
+    return db.query(func.count(TradeRecord.id))\
+             .filter(TradeRecord.id > after_id, TradeRecord.row_hash.is_(None))\
+             .scalar() or 0
+
+
+def iter_pending(db, after_id: int, chunk_size: int):
+    """Watermark dan keyingi, row_hash i yo'q qatorlar - id tartibida bo'laklab (id lar, hash lar)
+
+    row_hash i bor qatorlar unique indeks tufayli dublikat bo'la olmaydi - faqat
+    tashqaridan yoki row_hash dan oldin yozilgan qatorlar tekshiriladi.
+    """
+    last_id = after_id
+    while True:
+        rows = db.query(TradeRecord.id, *KEY_COLUMNS)\
+                 .filter(TradeRecord.id > last_id, TradeRecord.row_hash.is_(None))\
+                 .order_by(TradeRecord.id)\
+                 .limit(chunk_size)\
+                 .all()
+        if not rows:
+            return
+
+        ids = [r[0] for r in rows]
+        columns = {col: [r[i + 1] for r in rows] for i, col in enumerate(NATURAL_KEY_COLUMNS)}
+        yield ids, row_hashes(columns)
+        last_id = ids[-1]
+
+
+def newer_hash_holders(db, ids: list, hashes: list) -> list:
+    """Bo'lakdagi hash ni undan yangiroq (katta id li) qator allaqachon olgan bo'lsa - o'sha qatorlar
+
+    Masalan row_hash dan oldin yozilgan eski qator va uning keyin hash bilan import qilingan nusxasi.
+    """
+    first_ids = {}
+    for row_id, row_hash in zip(ids, hashes):
+        first_ids.setdefault(row_hash, row_id)
+
+    holders = db.query(TradeRecord.id, TradeRecord.row_hash)\
+                .filter(TradeRecord.row_hash.in_(list(first_ids)))\
+                .all()
+    return [row_id for row_id, row_hash in holders if row_id > first_ids[row_hash]]
+
+
+def remove_duplicates(db, chunk_size: int = DEDUPE_CHUNK_SIZE) -> dict:
+    """Yangi qatorlarni row_hash indeksi bo'yicha tekshirib, dublikatlarni bo'laklab o'chirish
+
+    Har nusxalar guruhidan eng eski (eng kichik id li) qator qoladi. Har bo'lak: hash ni olgan
+    yangiroq qatorlarni o'chirish, hash yozish (band hash - IGNORE, qator NULL qoladi), shu id
+    oralig'ida NULL qolganlarni o'chirish (o'chiriladiganlar oldin rollup lardan ayiriladi),
+    watermark - bitta qisqa tranzaksiyada. To'xtab qolsa keyingi ishga tushirish shu joydan davom etadi.
+    """
+    if not _lock.acquire(blocking=False):
+        raise RuntimeError("Dublikat tozalash allaqachon ishlamoqda")
+
+    try:
+        # Star rejimda trade_records - VIEW, yozish fakt jadvaliga
+        table = FACT_MODEL.__tablename__
+        ignore = "UPDATE OR IGNORE" if get_db_type() == "sqlite" else "UPDATE IGNORE"
+        update_sql = text(f"{ignore} {table} SET row_hash = :row_hash WHERE id = :id")
+        delete_sql = text(
+            f"DELETE FROM {table} WHERE id BETWEEN :first AND :last AND row_hash IS NULL"
+        )
+
+        watermark = get_watermark(db)
+        max_id = db.query(func.max(TradeRecord.id)).scalar() or 0
+        progress.start(count_pending(db, watermark), watermark)
+
+        for ids, hashes in iter_pending(db, watermark, chunk_size):
+            # Hash ni yangiroq qator olgan bo'lsa - o'sha qator dublikat, hash eski qatorga o'tadi
+            newer = newer_hash_holders(db, ids, hashes)
+            removed = 0
+            if newer:
+                rollups.remove_rows(db, db.query(*ROLLUP_COLUMNS).filter(TradeRecord.id.in_(newer)).all())
+                removed += db.query(FACT_MODEL).filter(FACT_MODEL.id.in_(newer))\
+                             .delete(synchronize_session=False)
+
+            # Bo'lak id tartibida - birinchi uchragan (eng eski) qator hash ni oladi
+            db.execute(update_sql, [{"row_hash": h, "id": i} for h, i in zip(hashes, ids)])
+            # Hash ololmagan (dublikat) qatorlar - o'chirishdan oldin rollup lardan ayiriladi
+            duplicates = db.query(*ROLLUP_COLUMNS)\
+                           .filter(TradeRecord.id.between(ids[0], ids[-1]), TradeRecord.row_hash.is_(None))\
+                           .all()
+            rollups.remove_rows(db, duplicates)
+            removed += db.execute(delete_sql, {"first": ids[0], "last": ids[-1]}).rowcount
+            if removed:
+                # Boshqa process lar snapshot larini qayta quradi
+                bump_data_version(db)
+            progress.last_checked_id = clamp_to_max_id(db, ids[-1])
+            set_watermark(db, progress.last_checked_id)
+            db.commit()
+
+            progress.rows_checked += len(ids)
+            progress.removed += removed
+            progress.chunks += 1
+
+        # Hash li yangi qatorlar ham tekshirilgan hisoblanadi - keyingi safar oraliq bo'sh
+        progress.last_checked_id = clamp_to_max_id(db, max_id)
+        set_watermark(db, progress.last_checked_id)
+        db.commit()
+
+        progress.finish("completed")
+        logger.info(
+            f"✅ Dublikat tekshiruvi: {progress.rows_checked} qator, "
+            f"{progress.removed} ta o'chirildi ({progress.chunks} bo'lak)"
+        )
+        return progress.to_dict()
+    except Exception as e:
+        db.rollback()
+        progress.finish("failed", str(e))
+        raise
+    finally:
+        _lock.release()
+
+
+def duplicate_stats(db, chunk_size: int = DEDUPE_CHUNK_SIZE) -> dict:
+    """Faqat tekshirilmagan qatorlar bo'yicha dublikatlar soni (hech narsa yozmaydi)"""
+    watermark = get_watermark(db)
+    pending = 0
+    counts = Counter()
+    for ids, hashes in iter_pending(db, watermark, chunk_size):
+        pending += len(ids)
+        counts.update(hashes)
+
+    # Bazada shu hash li qator bo'lsa - barcha yangi nusxalar dublikat
+    existing = set()
+    keys = list(counts)
+    for start in range(0, len(keys), chunk_size):
+        existing.update(
+            h for (h,) in db.query(TradeRecord.row_hash)
+            .filter(TradeRecord.row_hash.in_(keys[start:start + chunk_size]))
+        )
+
+    return {
+        "pending_records": pending,
+        "duplicate_groups": sum(1 for h, n in counts.items() if n > 1 or h in existing),
+        "total_duplicates": sum(n if h in existing else n - 1 for h, n in counts.items()),
+        "last_checked_id": watermark,
+    }
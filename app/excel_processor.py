@@ -1,19 +1,88 @@
 import pandas as pd
 import asyncio
-from sqlalchemy.orm import Session
-from app.database import TradeRecord, SessionLocal
+from app.database import TradeRecord, ImportedFile, SessionLocal, get_writer_engine, row_hashes, star_schema, env_int
+from app.bulk_loader import get_batch_loader, ORMBatchLoader
+from app import rollups
+from app.star_schema import star_resolver
+from app.text_search import index_batch_terms
 import numpy as np
-from concurrent.futures import ThreadPoolExecutor
+import openpyxl
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import logging
+import multiprocessing
+import os
+import queue
+import re
+import tempfile
 import time
+import zipfile
+import threading
+from datetime import datetime
+from functools import cached_property
+from xml.etree import ElementTree
 
 # Logging sozlash
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Zip arxivdan chiqariladigan fayllarning jami hajmi (upload chegarasi siqilgan hajmni cheklaydi, xolos)
+ZIP_MAX_EXTRACTED_SIZE = env_int("ZIP_MAX_EXTRACTED_MB", 1024) * 1024 * 1024
+ZIP_COPY_CHUNK = 1024 * 1024
+
 class ExcelProcessor:
-    def __init__(self):
+    # Excel ustun nomlari -> database ustun nomlari
+    COLUMN_MAPPING = {
+        '2 HS code': 'hs_2_code',
+        '4 HS code': 'hs_4_code',
+        '6 HS code': 'hs_6_code',
+        '10 HS code': 'hs_10_code',
+        'Product name': 'product_name',
+        'Measure': 'measure',
+        'Export volume': 'export_volume',
+        'Export price (1000 USD)': 'export_price',
+        'Import volume': 'import_volume',
+        'Import price (1000 USD)': 'import_price',
+        'Trading partner': 'trading_partner',
+        'Year': 'year',
+        'HS Group': 'hs_group'
+    }
+
+    SUPPORTED_EXTENSIONS = ('.xlsx', '.xls', '.csv', '.parquet', '.zip')
+    
+    NUMERIC_COLUMNS = ('export_volume', 'export_price', 'import_volume', 'import_price', 'year')
+    
+    # Ma'lumot varag'ida bo'lishi shart ustunlar (qolgan varaqlar import qilinmaydi)
+    REQUIRED_COLUMNS = ('product_name', 'year')
+    
+    # trade_records dagi yoziladigan ustunlar (id va hisoblanadigan row_hash dan tashqari)
+    TABLE_COLUMNS = tuple(c.name for c in TradeRecord.__table__.columns if c.name not in ('id', 'row_hash'))
+
+    def __init__(self, loader: str = "auto", writer_concurrency: int = 4, sheet_workers: int = None):
         self.batch_size = 20000
+        self.loader_kind = loader
+        self.writer_concurrency = writer_concurrency
+        # Ko'p varaqli workbook uchun parse process lari soni
+        self.sheet_workers = sheet_workers or os.cpu_count() or 1
+    
+    # Engine ga bog'liq sozlamalar birinchi importda aniqlanadi (ilova importi database ga ulanmaydi)
+    @cached_property
+    def loader(self):
+        """Dialect ga mos tez yuklash yo'li (SQLite da yagona writer ulanishi orqali)"""
+        return get_batch_loader(get_writer_engine(), self.loader_kind)
+    
+    @cached_property
+    def fallback_loader(self):
+        return ORMBatchLoader(get_writer_engine())
+    
+    @cached_property
+    def writer_count(self) -> int:
+        # SQLite bitta yozuvchini ko'taradi, MySQL - parallel writer lar
+        return 1 if get_writer_engine().dialect.name == "sqlite" else max(1, self.writer_concurrency)
+    
+    @property
+    def queue_size(self) -> int:
+        # Xotirada kutib turadigan batch lar soni
+        return self.writer_count * 2
         
     async def process_excel_file(self, file_path: str) -> dict:
         """Excel faylni tez va samarali import qilish"""
@@ -36,11 +105,14 @@ class ExcelProcessor:
             
             # 2. Ma'lumotlarni tozalash
             logger.info("🧹 Ma'lumotlar tozalanmoqda...")
-            df = self.clean_data(df)
+            df = await asyncio.get_running_loop().run_in_executor(None, self.clean_data, df)
             
             # 3. Database ga yuklash
             logger.info("💾 Database ga yuklanmoqda...")
-            total_inserted = await self.bulk_insert_parallel(df)
+            stats = await self.bulk_insert_parallel(df)
+            if stats["failed"]["batches"]:
+                return self.failed_batches_result(stats, len(df))
+            total_inserted = stats["insert"]["rows"]
             
             end_time = time.time()
             process_time = end_time - start_time
@@ -51,6 +123,7 @@ class ExcelProcessor:
                 "success": True,
                 "total_records": len(df),
                 "inserted_records": total_inserted,
+                "duplicate_records": len(df) - total_inserted,
                 "process_time": round(process_time, 2),
                 "message": f"✅ Muvaffaqiyatli! {total_inserted:,} ta record {process_time:.2f} soniyada import qilindi"
             }
@@ -63,6 +136,191 @@ class ExcelProcessor:
                 "message": f"Import jarayonida xatolik: {str(e)}"
             }
     
+    async def process_file(self, file_path: str, progress=None) -> dict:
+        """Fayl turiga qarab import: .xlsx, .xls, .csv, .parquet yoki ularning .zip arxivi"""
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext == '.xls':
+            return await self.process_excel_file(file_path)
+        if ext == '.xlsx':
+            sheets = await asyncio.get_running_loop().run_in_executor(None, self.data_sheets, file_path)
+            if len(sheets) > 1:
+                return await self.process_excel_sheets(file_path, sheets, progress=progress)
+            # Bitta ma'lumot varag'i (qolganlari izoh va h.k.) - oddiy streaming
+            return await self.process_excel_file_streaming(file_path, sheets[0] if sheets else None, progress)
+        
+        if ext == '.zip':
+            files = []
+            chunks = self.iter_zip_chunks(file_path, self.batch_size, files)
+            result = await self.process_chunks(chunks, progress=progress)
+            result["files"] = files
+            return result
+        
+        total_rows = None
+        if ext == '.parquet':
+            total_rows = await asyncio.get_running_loop().run_in_executor(None, self.count_parquet_rows, file_path)
+        return await self.process_chunks(self.iter_file_chunks(file_path, self.batch_size), total_rows, progress)
+    
+    async def process_excel_file_streaming(self, file_path: str, sheet_name: str = None, progress=None) -> dict:
+        """Excel varaqni (standart - birinchi) bo'laklab (streaming) import qilish - xotira batch hajmiga bog'liq"""
+        logger.info(f"📊 Streaming import boshlanadi: {file_path}")
+        chunks = self.iter_excel_chunks(file_path, self.batch_size, sheet_name=sheet_name)
+        total_rows = await asyncio.get_running_loop().run_in_executor(
+            None, self.count_excel_rows, file_path, [sheet_name] if sheet_name else None
+        )
+        return await self.process_chunks(chunks, total_rows, progress)
+    
+    async def process_excel_sheets(self, file_path: str, sheets: list, progress=None) -> dict:
+        """Ko'p varaqli workbook: ma'lumot varaqlari process pool da parallel o'qiladi va tozalanadi.
+        Worker lar tayyor bo'laklarni cheklangan navbat orqali pipeline ga beradi - xotirada
+        butun varaq emas, bir necha batch turadi."""
+        try:
+            start_time = time.time()
+            workers = max(1, min(self.sheet_workers, len(sheets)))
+            logger.info(f"📚 {len(sheets)} ta ma'lumot varag'i, {workers} ta process: {file_path}")
+            
+            loop = asyncio.get_running_loop()
+            total_rows = await loop.run_in_executor(None, self.count_excel_rows, file_path, sheets)
+            
+            # fork ko'p thread li uvicorn process idan xavfli (threadpool, pool lock lari)
+            context = multiprocessing.get_context("spawn")
+            chunk_queue = context.Queue(maxsize=workers * 2)
+            sheet_infos = {}
+            
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                     initializer=init_sheet_worker, initargs=(chunk_queue,)) as pool:
+                futures = [pool.submit(parse_sheet, file_path, sheet, self.batch_size) for sheet in sheets]
+                chunks = iter_sheet_chunks(chunk_queue, futures, sheet_infos)
+                try:
+                    stats = await self.run_import_pipeline(
+                        chunks, clean=False, progress=progress, total_rows=total_rows
+                    )
+                finally:
+                    # Pipeline to'xtagan bo'lsa ham worker lar to'la navbatda qotib qolmasligi uchun
+                    await loop.run_in_executor(None, drain_sheet_queue, chunk_queue, futures)
+            
+            # Varaqlar kitobdagi tartibda
+            sheet_stats = []
+            for sheet in sheets:
+                info = sheet_infos.get(sheet, {"sheet": sheet})
+                info["inserted_records"] = stats["sources"].get(sheet, 0)
+                sheet_stats.append(info)
+                logger.info(f"📄 Varaq '{sheet}': {info}")
+            
+            # O'qish/tozalash worker larda - vaqtlari ular hisobotidan
+            for stage, rows_key in (("read", "read_records"), ("clean", "total_records")):
+                stats[stage] = {
+                    "rows": sum(info.get(rows_key, 0) for info in sheet_stats),
+                    "seconds": sum(info.get(f"{stage}_seconds", 0.0) for info in sheet_stats),
+                }
+            
+            if stats["read"]["rows"] == 0:
+                return {
+                    "success": False,
+                    "error": "Excel fayl bo'sh yoki o'qib bo'lmadi",
+                    "message": "Fayl formatini tekshiring",
+                    "sheets": sheet_stats
+                }
+            
+            total_cleaned = stats["clean"]["rows"]
+            if stats["failed"]["batches"]:
+                return {**self.failed_batches_result(stats, total_cleaned), "sheets": sheet_stats}
+            
+            total_inserted = stats["insert"]["rows"]
+            process_time = time.time() - start_time
+            logger.info(f"🎉 Ko'p varaqli import yakunlandi: {total_inserted} ta record, {process_time:.2f} soniya")
+            
+            return {
+                "success": True,
+                "total_records": total_cleaned,
+                "read_records": stats["read"]["rows"],
+                "inserted_records": total_inserted,
+                "duplicate_records": total_cleaned - total_inserted,
+                "batches": stats["batches"],
+                "workers": workers,
+                "sheets": sheet_stats,
+                "stages": self.stage_throughput(stats),
+                "process_time": round(process_time, 2),
+                "message": f"✅ Muvaffaqiyatli! {len(sheets)} ta varaqdan {total_inserted:,} ta record {process_time:.2f} soniyada import qilindi"
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Ko'p varaqli import xatolik: {str(e)}")
+            return {
+                "success": False,
+                "error": str(e),
+                "message": f"Import jarayonida xatolik: {str(e)}"
+            }
+    
+    async def process_chunks(self, chunks, total_rows: int = None, progress=None) -> dict:
+        """Bo'laklar iteratorini pipeline orqali import qilish va natija dict ini qaytarish"""
+        try:
+            start_time = time.time()
+            
+            stats = await self.run_import_pipeline(chunks, progress=progress, total_rows=total_rows)
+            
+            total_read = stats["read"]["rows"]
+            total_cleaned = stats["clean"]["rows"]
+            total_inserted = stats["insert"]["rows"]
+            
+            if total_read == 0:
+                return {
+                    "success": False,
+                    "error": "Fayl bo'sh yoki o'qib bo'lmadi",
+                    "message": "Fayl formatini tekshiring"
+                }
+            
+            if stats["failed"]["batches"]:
+                return self.failed_batches_result(stats, total_cleaned)
+            
+            process_time = time.time() - start_time
+            logger.info(f"🎉 Streaming import yakunlandi: {total_inserted} ta record, {process_time:.2f} soniya")
+            
+            return {
+                "success": True,
+                "total_records": total_cleaned,
+                "read_records": total_read,
+                "inserted_records": total_inserted,
+                "duplicate_records": total_cleaned - total_inserted,
+                "batches": stats["batches"],
+                "stages": self.stage_throughput(stats),
+                "process_time": round(process_time, 2),
+                "message": f"✅ Muvaffaqiyatli! {total_inserted:,} ta record {process_time:.2f} soniyada import qilindi"
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Streaming import xatolik: {str(e)}")
+            return {
+                "success": False,
+                "error": str(e),
+                "message": f"Import jarayonida xatolik: {str(e)}"
+            }
+    
+    def find_imported_file(self, file_hash: str):
+        """Fayl avval import qilinganmi (sha256 bo'yicha)"""
+        db = SessionLocal()
+        try:
+            return db.query(ImportedFile).filter(ImportedFile.file_hash == file_hash).first()
+        finally:
+            db.close()
+    
+    def mark_file_imported(self, file_hash: str, filename: str, file_size: int, rows_inserted: int):
+        """Muvaffaqiyatli import qilingan fayl fingerprint ini saqlash"""
+        db = SessionLocal()
+        try:
+            db.add(ImportedFile(
+                file_hash=file_hash,
+                filename=filename[:255],
+                file_size=file_size,
+                rows_inserted=rows_inserted
+            ))
+            db.commit()
+        except Exception as e:
+            # Parallel yuklangan bir xil fayl - allaqachon saqlangan
+            db.rollback()
+            logger.warning(f"⚠️ Fayl fingerprint saqlanmadi: {str(e)}")
+        finally:
+            db.close()
+    
     async def read_excel_file(self, file_path: str) -> pd.DataFrame:
         """Excel faylni oddiy usulda o'qish"""
         try:
@@ -76,28 +334,11 @@ class ExcelProcessor:
             with ThreadPoolExecutor(max_workers=1) as executor:
                 df = await loop.run_in_executor(executor, read_excel_sync)
             
-            # Ustun nomlarini o'zgartirish
-            column_mapping = {
-                '2 HS code': 'hs_2_code',
-                '4 HS code': 'hs_4_code', 
-                '6 HS code': 'hs_6_code',
-                '10 HS code': 'hs_10_code',
-                'Product name': 'product_name',
-                'Measure': 'measure',
-                'Export volume': 'export_volume',
-                'Export price (1000 USD)': 'export_price',
-                'Import volume': 'import_volume', 
-                'Import price (1000 USD)': 'import_price',
-                'Trading partner': 'trading_partner',
-                'Year': 'year',
-                'HS Group': 'hs_group'
-            }
-            
             if not df.empty:
                 logger.info(f"📋 Asl ustunlar: {list(df.columns)}")
                 
                 # Ustun nomlarini o'zgartirish
-                df = df.rename(columns=column_mapping)
+                df = df.rename(columns=self.COLUMN_MAPPING)
                 logger.info(f"📋 Yangi ustunlar: {list(df.columns)}")
             
             return df
@@ -106,6 +347,231 @@ class ExcelProcessor:
             logger.error(f"❌ Excel o'qishda xatolik: {str(e)}")
             return None
     
+    def iter_excel_chunks(self, file_path: str, chunk_size: int, sheet_name: str = None):
+        """Excel varaqni (standart - birinchi) openpyxl read-only rejimida chunk_size qatordan o'qish"""
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+            rows = sheet.iter_rows(values_only=True)
+            
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [
+                self.COLUMN_MAPPING.get(str(h).strip(), str(h).strip()) if h is not None else f"Unnamed: {i}"
+                for i, h in enumerate(header)
+            ]
+            width = len(columns)
+            logger.info(f"📋 Ustunlar: {columns}")
+            
+            chunk = []
+            for row in rows:
+                values = [self._cell_to_str(value) for value in row[:width]]
+                # read-only rejimda qatorlar qisqaroq bo'lishi mumkin
+                values.extend([np.nan] * (width - len(values)))
+                chunk.append(values)
+                if len(chunk) >= chunk_size:
+                    yield pd.DataFrame(chunk, columns=columns, dtype=object)
+                    chunk = []
+            
+            if chunk:
+                yield pd.DataFrame(chunk, columns=columns, dtype=object)
+        finally:
+            workbook.close()
+    
+    def iter_file_chunks(self, file_path: str, chunk_size: int):
+        """Kengaytmaga qarab mos o'quvchi (zip ichidagi fayllar uchun ham)"""
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext == '.xlsx':
+            return self.iter_excel_chunks(file_path, chunk_size)
+        if ext == '.csv':
+            return self.iter_csv_chunks(file_path, chunk_size)
+        if ext == '.parquet':
+            return self.iter_parquet_chunks(file_path, chunk_size)
+        if ext == '.xls':
+            # .xls ni openpyxl o'qiy olmaydi - to'liq o'qib, bo'laklarga bo'lish
+            df = pd.read_excel(file_path, dtype=str).rename(columns=self.COLUMN_MAPPING)
+            return (df[i:i + chunk_size] for i in range(0, len(df), chunk_size))
+        raise ValueError(f"Qo'llab-quvvatlanmaydigan fayl turi: {ext}")
+    
+    def iter_csv_chunks(self, file_path: str, chunk_size: int):
+        """CSV faylni pandas chunksize bilan o'qish (hamma ustun string)"""
+        reader = pd.read_csv(file_path, dtype=str, chunksize=chunk_size, encoding='utf-8-sig')
+        with reader:
+            for chunk in reader:
+                chunk.columns = [str(c).strip() for c in chunk.columns]
+                yield chunk.rename(columns=self.COLUMN_MAPPING)
+    
+    def iter_parquet_chunks(self, file_path: str, chunk_size: int):
+        """Parquet faylni row group/batch lab o'qish - faqat kerakli ustunlar"""
+        import pyarrow.parquet as pq
+        
+        parquet_file = pq.ParquetFile(file_path)
+        wanted = set(self.COLUMN_MAPPING) | set(self.COLUMN_MAPPING.values())
+        columns = [name for name in parquet_file.schema_arrow.names if name in wanted]
+        
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            chunk = self._to_str_frame(batch.to_pandas())
+            yield chunk.rename(columns=self.COLUMN_MAPPING)
+    
+    def zip_members(self, archive: zipfile.ZipFile) -> list:
+        """Import qilinadigan zip a'zolari (papka, yashirin va qo'llab-quvvatlanmaydigan fayllarsiz)"""
+        members = []
+        for member in archive.infolist():
+            name = os.path.basename(member.filename)
+            ext = os.path.splitext(name)[1].lower()
+            if member.is_dir() or name.startswith('.') or member.filename.startswith('__MACOSX/'):
+                continue
+            if ext not in self.SUPPORTED_EXTENSIONS or ext == '.zip':
+                logger.warning(f"⚠️ Zip ichidagi fayl o'tkazib yuborildi: {member.filename}")
+                continue
+            members.append(member)
+        return members
+    
+    @staticmethod
+    def copy_limited(src, out, limit: int) -> int:
+        """src ni out ga ko'chirish - limit baytdan oshsa to'xtatish (sarlavhadagi hajmga ishonilmaydi)"""
+        copied = 0
+        while True:
+            block = src.read(ZIP_COPY_CHUNK)
+            if not block:
+                return copied
+            copied += len(block)
+            if copied > limit:
+                raise ValueError(
+                    f"Zip ichidagi fayllar hajmi {ZIP_MAX_EXTRACTED_SIZE // (1024 * 1024)}MB dan oshadi"
+                )
+            out.write(block)
+    
+    def iter_zip_chunks(self, file_path: str, chunk_size: int, files: list = None):
+        """Zip arxivdagi fayllarni birma-bir vaqtinchalik faylga chiqarib o'qish"""
+        with zipfile.ZipFile(file_path) as archive:
+            members = self.zip_members(archive)
+            
+            # Zip bomb: e'lon qilingan hajm bo'yicha hech narsa chiqarmasdan rad etish
+            if sum(member.file_size for member in members) > ZIP_MAX_EXTRACTED_SIZE:
+                raise ValueError(
+                    f"Zip ichidagi fayllar hajmi {ZIP_MAX_EXTRACTED_SIZE // (1024 * 1024)}MB dan oshadi"
+                )
+            
+            remaining = ZIP_MAX_EXTRACTED_SIZE
+            for member in members:
+                ext = os.path.splitext(member.filename)[1].lower()
+                
+                # Faqat asl nom kengaytmasi - arxivdagi yo'l ishlatilmaydi (zip-slip)
+                fd, member_path = tempfile.mkstemp(suffix=ext, prefix="zip_member_")
+                try:
+                    with os.fdopen(fd, 'wb') as out, archive.open(member) as src:
+                        remaining -= self.copy_limited(src, out, remaining)
+                    
+                    logger.info(f"📦 Zip ichidagi fayl o'qilmoqda: {member.filename}")
+                    rows = 0
+                    for chunk in self.iter_file_chunks(member_path, chunk_size):
+                        rows += len(chunk)
+                        yield chunk
+                    if files is not None:
+                        files.append({"filename": member.filename, "read_records": rows})
+                finally:
+                    os.remove(member_path)
+    
+    def count_parquet_rows(self, file_path: str):
+        """Parquet metadata dan qatorlar soni"""
+        try:
+            import pyarrow.parquet as pq
+            return pq.ParquetFile(file_path).metadata.num_rows
+        except Exception:
+            return None
+    
+    @staticmethod
+    def _to_str_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Tiplangan ustunlarni pd.read_excel(dtype=str) kabi stringga o'tkazish"""
+        for col in df.columns:
+            series = df[col]
+            missing = series.isna()
+            # 1202410000.0 -> '1202410000' (HS kodlar, yillar)
+            if series.dtype.kind == 'f' and (series[~missing] % 1 == 0).all():
+                series = series.astype('Int64')
+            df[col] = series.astype(str).where(~missing, np.nan)
+        return df
+    
+    def count_excel_rows(self, file_path: str, sheet_names: list = None):
+        """Birinchi (yoki berilgan) varaqlardagi ma'lumot qatorlari soni (varaq o'lchamidan, taxminiy)"""
+        try:
+            sheets = self.inspect_xlsx(file_path)
+        except Exception:
+            return None
+        if sheet_names is not None:
+            sheets = [sheet for sheet in sheets if sheet[0] in sheet_names]
+        else:
+            sheets = sheets[:1]
+        rows = [sheet_rows for _, sheet_rows in sheets]
+        if not rows or None in rows:
+            return None
+        return sum(rows)
+    
+    def list_sheets(self, file_path: str) -> list:
+        """Workbook dagi varaqlar nomlari"""
+        return [name for name, _ in self.inspect_xlsx(file_path)]
+    
+    def is_data_header(self, header) -> bool:
+        """Sarlavha qatori COLUMN_MAPPING bo'yicha kerakli ustunlarni o'z ichiga oladimi"""
+        columns = {self.COLUMN_MAPPING.get(str(h).strip(), str(h).strip()) for h in header if h is not None}
+        return set(self.REQUIRED_COLUMNS).issubset(columns)
+    
+    def data_sheets(self, file_path: str) -> list:
+        """Sarlavhasi ma'lumot jadvaliga mos varaqlar (izoh, ma'lumotnoma varaqlarisiz)"""
+        sheets = self.list_sheets(file_path)
+        if len(sheets) <= 1:
+            # Bitta varaq - sarlavhani tekshirish uchun workbook ni ochish shart emas
+            return sheets
+        
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            return [
+                sheet.title for sheet in workbook.worksheets
+                if self.is_data_header(next(sheet.iter_rows(max_row=1, values_only=True), ()))
+            ]
+        finally:
+            workbook.close()
+    
+    @staticmethod
+    def inspect_xlsx(file_path: str) -> list:
+        """Varaqlar nomi va <dimension> dagi qatorlar soni - workbook ni to'liq ochmasdan
+        
+        openpyxl.load_workbook har safar sharedStrings ni to'liq o'qiydi, katta fayllarda
+        bu soniyalar oladi. Bu yerda faqat workbook.xml va varaq XML boshi o'qiladi.
+        """
+        ns_main = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+        ns_rel = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+        
+        with zipfile.ZipFile(file_path) as archive:
+            workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+            rels = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+            targets = {rel.get('Id'): rel.get('Target') for rel in rels}
+            
+            sheets = []
+            for sheet in workbook.iter(f'{ns_main}sheet'):
+                target = targets.get(sheet.get(f'{ns_rel}id'), '')
+                path = target.lstrip('/') if target.startswith('/') else f'xl/{target}'
+                rows = None
+                if path in archive.namelist():
+                    with archive.open(path) as f:
+                        head = f.read(8192)
+                    match = re.search(rb'<(?:\w+:)?dimension ref="[A-Z]+\d+:[A-Z]+(\d+)"', head)
+                    if match:
+                        rows = max(int(match.group(1)) - 1, 0)
+                sheets.append((sheet.get('name'), rows))
+            return sheets
+    
+    @staticmethod
+    def _cell_to_str(value):
+        """Katak qiymatini pd.read_excel(dtype=str) bilan bir xil stringga o'tkazish"""
+        if value is None:
+            return np.nan
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return str(value)
+    
     def clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Ma'lumotlarni oddiy usulda tozalash"""
         try:
@@ -168,64 +634,295 @@ class ExcelProcessor:
             logger.error(f"❌ Ma'lumot tozalashda xatolik: {str(e)}")
             return df
     
-    async def bulk_insert_parallel(self, df: pd.DataFrame) -> int:
-        """Parallel bulk insert"""
-        try:
-            total_inserted = 0
+    async def bulk_insert_parallel(self, df: pd.DataFrame) -> dict:
+        """Tozalangan DataFrame ni pipeline orqali parallel yozish (pipeline statistikasi)"""
+        # Ma'lumotlarni batch larga bo'lish (nusxa olmasdan, lazy)
+        batches = (df[i:i + self.batch_size] for i in range(0, len(df), self.batch_size))
+        stats = await self.run_import_pipeline(batches, clean=False)
+        
+        logger.info(f"✅ Jami {stats['insert']['rows']} ta record yozildi")
+        return stats
+    
+    async def run_import_pipeline(self, chunks, clean: bool = True, progress=None, total_rows: int = None) -> dict:
+        """Producer (o'qish + tozalash) va writer lar cheklangan navbat orqali ulangan pipeline
+        
+        chunks - DataFrame bo'laklarini beradigan oddiy (sync) iterator.
+        Producer keyingi bo'lakni o'qiyotganda writer lar oldingi batch larni yozadi.
+        progress(stage, stats) - har bosqichdan keyin chaqiriladi (worker thread larda).
+        """
+        stats = {
+            "batches": 0,
+            "total_rows": total_rows,
+            "writers": self.writer_count,
+            "read": {"rows": 0, "seconds": 0.0},
+            "clean": {"rows": 0, "seconds": 0.0},
+            "insert": {"rows": 0, "seconds": 0.0},
+            # Yozilmagan batch lar - bittasi bo'lsa ham import muvaffaqiyatsiz
+            "failed": {"batches": 0, "rows": 0, "error": None},
+            # chunk.attrs["source"] bo'yicha yozilgan qatorlar (masalan, varaq nomi)
+            "sources": {},
+        }
+        batch_queue = asyncio.Queue(maxsize=self.queue_size)
+        loop = asyncio.get_event_loop()
+        stats_lock = threading.Lock()
+        
+        def report(stage):
+            if progress:
+                progress(stage, stats)
+        
+        def read_and_clean():
+            """Keyingi bo'lakni o'qish va tozalash (producer thread ida)"""
+            t0 = time.perf_counter()
+            chunk = next(chunks, None)
+            t1 = time.perf_counter()
+            stats["read"]["seconds"] += t1 - t0
+            if chunk is None:
+                return None
             
-            # Ma'lumotlarni batch larga bo'lish
-            batches = [df[i:i + self.batch_size] for i in range(0, len(df), self.batch_size)]
-            logger.info(f"📦 {len(batches)} ta batch yaratildi")
+            stats["read"]["rows"] += len(chunk)
+            report("reading")
+            if clean:
+                chunk = self.clean_data(chunk)
+                stats["clean"]["seconds"] += time.perf_counter() - t1
+            stats["clean"]["rows"] += len(chunk)
+            report("cleaning")
+            return chunk
+        
+        def write(chunk, batch_num):
+            t0 = time.perf_counter()
+            try:
+                inserted = self.insert_batch(chunk, batch_num, deltas)
+            except Exception as e:
+                logger.error(f"❌ Batch {batch_num} xatolik: {str(e)}")
+                with stats_lock:
+                    stats["failed"]["batches"] += 1
+                    stats["failed"]["rows"] += len(chunk)
+                    stats["failed"]["error"] = str(e)
+                inserted = 0
+            source = chunk.attrs.get("source")
+            with stats_lock:
+                stats["insert"]["seconds"] += time.perf_counter() - t0
+                stats["insert"]["rows"] += inserted
+                if source is not None:
+                    stats["sources"][source] = stats["sources"].get(source, 0) + inserted
+            report("inserting")
+        
+        async def producer(executor):
+            try:
+                while True:
+                    chunk = await loop.run_in_executor(executor, read_and_clean)
+                    if chunk is None:
+                        break
+                    if chunk.empty:
+                        continue
+                    stats["batches"] += 1
+                    # Navbat to'la bo'lsa - writer lar bo'shaguncha kutish (backpressure)
+                    await batch_queue.put((chunk, stats["batches"]))
+            finally:
+                report("inserting")
+                for _ in range(self.writer_count):
+                    await batch_queue.put(None)
+        
+        async def writer(executor):
+            while True:
+                item = await batch_queue.get()
+                if item is None:
+                    break
+                await loop.run_in_executor(executor, write, *item)
+        
+        with ThreadPoolExecutor(max_workers=1) as read_executor, \
+                ThreadPoolExecutor(max_workers=self.writer_count) as write_executor:
+            # Rollup delta lari butun import uchun yig'iladi va oxirida bir marta yoziladi
+            deltas = await loop.run_in_executor(read_executor, rollups.ImportDelta)
+            writers = [asyncio.create_task(writer(write_executor)) for _ in range(self.writer_count)]
+            try:
+                await producer(read_executor)
+            finally:
+                await asyncio.gather(*writers)
+                # Xatolik bo'lsa ham - commit bo'lgan batch lar hisobga olinadi
+                await loop.run_in_executor(read_executor, deltas.apply)
+        
+        logger.info(f"📦 Pipeline: {stats['batches']} ta batch, {self.writer_count} ta writer, "
+                    f"bosqichlar: {self.stage_throughput(stats)}")
+        return stats
+    
+    @staticmethod
+    def failed_batches_result(stats: dict, total_records: int) -> dict:
+        """Yozilmagan batch lar bo'lsa - import muvaffaqiyatsiz (fayl import qilingan deb belgilanmaydi)"""
+        failed = stats["failed"]
+        return {
+            "success": False,
+            "error": f"{failed['batches']} ta batch ({failed['rows']:,} qator) yozilmadi: {failed['error']}",
+            "total_records": total_records,
+            "inserted_records": stats["insert"]["rows"],
+            "failed_batches": failed["batches"],
+            "failed_records": failed["rows"],
+            "message": "Import to'liq bajarilmadi - faylni qayta yuklash mumkin, yozilgan qatorlar takrorlanmaydi"
+        }
+    
+    @staticmethod
+    def stage_throughput(stats: dict) -> dict:
+        """Har bir bosqich uchun qator/soniya"""
+        result = {}
+        for stage in ("read", "clean", "insert"):
+            rows = stats[stage]["rows"]
+            seconds = stats[stage]["seconds"]
+            result[stage] = {
+                "rows": rows,
+                "seconds": round(seconds, 3),
+                "rows_per_sec": round(rows / seconds) if seconds > 0 else None,
+            }
+        return result
+    
+    def build_batch_columns(self, batch_df: pd.DataFrame) -> dict:
+        """Batch ni ustunlar bo'yicha tayyorlash (NaN/bo'sh qiymatlar har ustunda bir marta)"""
+        columns = {}
+        for col in batch_df.columns:
+            if col not in self.TABLE_COLUMNS:
+                continue
             
-            # Sequential processing
-            for i, batch in enumerate(batches):
-                logger.info(f"📤 Batch {i+1}/{len(batches)} yuklanmoqda...")
-                result = self.insert_batch(batch, i+1)
-                total_inserted += result
-                
-                # Kichik pauza
-                await asyncio.sleep(0.1)
+            series = batch_df[col]
+            default = 0 if col in self.NUMERIC_COLUMNS else ''
             
-            logger.info(f"✅ Jami {total_inserted} ta record yozildi")
-            return total_inserted
+            if series.dtype == object:
+                # Bo'sh, 'nan' va NaN qiymatlar -> default
+                as_str = series.astype(str)
+                empty_mask = series.isna().to_numpy() | (as_str.str.strip() == '').to_numpy() | (as_str == 'nan').to_numpy()
+                values = series.to_numpy(dtype=object, copy=True)
+                values[empty_mask] = default
+            elif series.dtype.kind == 'f':
+                values = series.to_numpy(copy=True)
+                values[np.isnan(values)] = default
+            else:
+                values = series.to_numpy()
             
-        except Exception as e:
-            logger.error(f"❌ Bulk insert xatolik: {str(e)}")
-            return 0
+            # numpy skalyarlarni Python tiplariga (DB driverlar uchun)
+            columns[col] = values.tolist()
+        
+        if columns and 'created_at' not in columns:
+            now = datetime.utcnow()
+            columns['created_at'] = [now] * len(batch_df)
+        
+        if columns:
+            # Dublikatlar ingest paytida to'xtatiladi (unique row_hash + INSERT IGNORE)
+            columns['row_hash'] = row_hashes(columns)
+        
+        return columns
     
-    def insert_batch(self, batch_df: pd.DataFrame, batch_num: int) -> int:
-        """Bir batch ni database ga yozish"""
-        db = SessionLocal()
+    def insert_batch(self, batch_df: pd.DataFrame, batch_num: int, deltas: rollups.ImportDelta = None) -> int:
+        """Bir batch ni database ga yozish (xatolik pipeline da yozilmagan batch sifatida hisoblanadi)
+
+        deltas - import bo'yicha rollup delta lari (pipeline oxirida yoziladi); berilmasa batch
+        o'zi yozadi.
+        """
+        # Ustunlar bo'yicha tayyorlash
+        columns = self.build_batch_columns(batch_df)
+        if not columns:
+            return 0
+        
+        # Star rejimda matn ustunlari lug'at id lariga almashtiriladi
+        load_columns = star_resolver.to_fact_columns(columns) if star_schema else columns
+        # /stats uchun yig'indilar - loader tranzaksiyasida hisoblanadi (yozilgan qatorlar bo'yicha)
+        own_deltas = deltas is None
+        if own_deltas:
+            deltas = rollups.ImportDelta()
+        delta = rollups.BatchDelta(columns)
+        
         try:
-            # DataFrame ni dict formatiga o'tkazish
-            records = batch_df.to_dict('records')
-            
-            # Har bir record ni tozalash
-            clean_records = []
-            for record in records:
-                clean_record = {}
-                for key, value in record.items():
-                    if pd.isna(value) or str(value).strip() == '' or str(value) == 'nan':
-                        if key in ['export_volume', 'export_price', 'import_volume', 'import_price', 'year']:
-                            clean_record[key] = 0
-                        else:
-                            clean_record[key] = ''
-                    else:
-                        clean_record[key] = value
-                clean_records.append(clean_record)
-            
-            # Database ga yozish
-            if clean_records:
-                db.bulk_insert_mappings(TradeRecord, clean_records)
-                db.commit()
-                logger.info(f"✅ Batch {batch_num}: {len(clean_records)} ta record yozildi")
-                return len(clean_records)
-            else:
-                return 0
-            
+            inserted = self.loader.load(load_columns, delta)
         except Exception as e:
-            db.rollback()
-            logger.error(f"❌ Batch {batch_num} xatolik: {str(e)}")
-            return 0
-        finally:
-            db.close()
\ No newline at end of file
+            if self.loader.name == ORMBatchLoader.name:
+                raise
+            # Tez yo'l ishlamasa - ORM fallback
+            logger.warning(f"⚠️ Batch {batch_num}: {self.loader.name} loader xatolik, ORM ga o'tildi: {e}")
+            inserted = self.fallback_loader.load(load_columns, delta)
+        deltas.add(delta)
+        if own_deltas:
+            deltas.apply()
+        
+        # Matn qidiruv indeksi - commit dan keyin, faqat batch dagi noyob qiymatlar
+        if inserted:
+            try:
+                index_batch_terms(columns)
+            except Exception as e:
+                logger.warning(f"⚠️ Batch {batch_num}: qidiruv indeksi yangilanmadi (init_db.py qayta to'ldiradi): {e}")
+        
+        logger.info(f"✅ Batch {batch_num}: {inserted} ta record yozildi")
+        return inserted
+
+
+# Worker process dagi umumiy navbat (init_sheet_worker o'rnatadi)
+_sheet_queue = None
+
+
+def init_sheet_worker(chunk_queue):
+    """ProcessPoolExecutor worker i ishga tushganda: bo'laklar yuboriladigan navbat"""
+    global _sheet_queue
+    _sheet_queue = chunk_queue
+
+
+def parse_sheet(file_path: str, sheet_name: str, chunk_size: int) -> dict:
+    """Bitta varaqni bo'laklab o'qish va tozalash (ProcessPoolExecutor worker ida ishlaydi)
+
+    Har tozalangan bo'lak (varaq, bo'lak, None) ko'rinishida navbatga qo'yiladi, oxirida
+    (varaq, None, statistika). Navbat to'la bo'lsa put kutadi - o'qish yozishdan o'zib ketmaydi.
+    """
+    processor = ExcelProcessor()
+    info = {
+        "sheet": sheet_name,
+        "read_records": 0,
+        "total_records": 0,
+        "read_seconds": 0.0,
+        "clean_seconds": 0.0,
+    }
+    
+    t0 = time.perf_counter()
+    for chunk in processor.iter_excel_chunks(file_path, chunk_size, sheet_name=sheet_name):
+        t1 = time.perf_counter()
+        info["read_seconds"] += t1 - t0
+        info["read_records"] += len(chunk)
+        
+        chunk = processor.clean_data(chunk)
+        info["clean_seconds"] += time.perf_counter() - t1
+        info["total_records"] += len(chunk)
+        if not chunk.empty:
+            _sheet_queue.put((sheet_name, chunk, None))
+        t0 = time.perf_counter()
+    
+    info["read_seconds"] = round(info["read_seconds"], 3)
+    info["clean_seconds"] = round(info["clean_seconds"], 3)
+    _sheet_queue.put((sheet_name, None, info))
+    return info
+
+
+def iter_sheet_chunks(chunk_queue, futures: list, sheet_infos: dict):
+    """Worker lar navbatidan bo'laklar (pipeline producer thread ida); varaq statistikasi sheet_infos ga"""
+    remaining = len(futures)
+    while remaining:
+        try:
+            sheet_name, chunk, info = chunk_queue.get(timeout=0.5)
+        except queue.Empty:
+            # Worker xatolik bilan tugagan bo'lsa yakuniy xabar kelmaydi
+            for future in futures:
+                if future.done() and future.exception():
+                    raise future.exception()
+            continue
+        
+        if chunk is None:
+            sheet_infos[sheet_name] = info
+            remaining -= 1
+            continue
+        # Pipeline varaq bo'yicha yozilgan qatorlarni hisoblaydi
+        chunk.attrs["source"] = sheet_name
+        yield chunk
+
+
+def drain_sheet_queue(chunk_queue, futures: list):
+    """Boshlanmagan varaqlarni bekor qilish va ishlayotgan worker lar tugaguncha navbatni bo'shatish"""
+    for future in futures:
+        future.cancel()
+    while not all(future.done() for future in futures):
+        try:
+            chunk_queue.get(timeout=0.1)
+        except queue.Empty:
+            pass
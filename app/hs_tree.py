@@ -0,0 +1,100 @@
+from sqlalchemy import func
+
+from app.database import TradeRecord
+
+# Ierarxiya darajalari (yuqoridan pastga) va ularning ustunlari
+HS_LEVELS = ('hs_2', 'hs_4', 'hs_6', 'hs_10')
+HS_COLUMNS = {
+    'hs_2': TradeRecord.hs_2_code,
+    'hs_4': TradeRecord.hs_4_code,
+    'hs_6': TradeRecord.hs_6_code,
+    'hs_10': TradeRecord.hs_10_code,
+}
+# Kod uzunligi bo'yicha daraja (level berilmaganda)
+LEVEL_BY_LENGTH = {2: 'hs_2', 4: 'hs_4', 6: 'hs_6', 10: 'hs_10'}
+
+MEASURES = ('import_volume', 'import_price', 'export_volume', 'export_price')
+
+
+def new_node(level, code, name=None) -> dict:
+    return {
+        "level": level,
+        "code": code,
+        "name": name,
+        "count": 0,
+        **{m: 0.0 for m in MEASURES},
+        "children": set(),
+    }
+
+
+class HSTree:
+    """HS-2 -> HS-4 -> HS-6 -> HS-10 daraxti, har tugunda qatorlar soni va yig'indilar"""
+
+    def __init__(self):
+        self.nodes = {level: {} for level in HS_LEVELS}
+        self.root = new_node(None, None)
+
+    @classmethod
+    def build(cls, db) -> "HSTree":
+        """Bitta GROUP BY (HS-10 darajasida) va Python da yuqoriga yig'ish"""
+        tree = cls()
+        rows = db.query(
+            *HS_COLUMNS.values(),
+            func.min(TradeRecord.product_name),
+            func.min(TradeRecord.hs_group),
+            func.count(TradeRecord.id),
+            *[func.coalesce(func.sum(getattr(TradeRecord, m)), 0) for m in MEASURES]
+        ).group_by(*HS_COLUMNS.values()).all()
+
+        for row in rows:
+            path = ['' if code is None else code for code in row[:4]]
+            product_name, hs_group, count = row[4:7]
+            totals = dict(zip(MEASURES, row[7:]))
+
+            parent = tree.root
+            for level, code in zip(HS_LEVELS, path):
+                nodes = tree.nodes[level]
+                if code not in nodes:
+                    # HS-2 - guruh nomi, HS-10 - mahsulot nomi
+                    name = hs_group if level == 'hs_2' else product_name if level == 'hs_10' else None
+                    nodes[code] = new_node(level, code, name)
+                parent["children"].add(code)
+                parent = nodes[code]
+
+            for node in [tree.root] + [tree.nodes[level][code] for level, code in zip(HS_LEVELS, path)]:
+                node["count"] += count
+                for m in MEASURES:
+                    node[m] += float(totals[m])
+
+        return tree
+
+    @staticmethod
+    def child_level(level):
+        if level is None:
+            return HS_LEVELS[0]
+        index = HS_LEVELS.index(level)
+        return HS_LEVELS[index + 1] if index + 1 < len(HS_LEVELS) else None
+
+    def get(self, level, code):
+        """Tugunni topish (None, None - ildiz)"""
+        if level is None and code is None:
+            return self.root
+        return self.nodes.get(level, {}).get(code)
+
+    @staticmethod
+    def to_dict(node) -> dict:
+        return {
+            "level": node["level"],
+            "code": node["code"],
+            "name": node["name"],
+            "count": node["count"],
+            **{m: node[m] for m in MEASURES},
+            "children_count": len(node["children"]),
+            "has_children": bool(node["children"]),
+        }
+
+    def children(self, level, code) -> list:
+        """Tugunning bevosita bolalari (kod bo'yicha tartiblangan)"""
+        node = self.get(level, code)
+        nodes = self.nodes[self.child_level(level)] if node["children"] else {}
+        return [self.to_dict(nodes[child]) for child in sorted(node["children"])]
@@ -0,0 +1,256 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+
+from sqlalchemy import update
+
+from app.database import SessionLocal, ImportJobState, env_int
+
+logger = logging.getLogger(__name__)
+
+# Ishlayotgan vazifa holati jadvalga shu oraliqda (soniya) yoziladi; o'zgarish bo'lmasa ham
+# heartbeat sifatida JOB_HEARTBEAT_SECONDS da bir marta
+JOB_PERSIST_SECONDS = env_int("JOB_PERSIST_SECONDS", 1)
+JOB_HEARTBEAT_SECONDS = env_int("JOB_HEARTBEAT_SECONDS", 30)
+# Heartbeat shuncha vaqt kelmasa - vazifani boshlagan worker to'xtagan (restart/crash)
+JOB_STALE_SECONDS = env_int("JOB_STALE_SECONDS", 5 * JOB_HEARTBEAT_SECONDS)
+
+# Jadval ustunlari (to_row / from_state)
+STATE_FIELDS = (
+    "filename", "file_size", "file_hash", "status", "stage", "total_rows", "rows_read",
+    "rows_cleaned", "rows_inserted", "batches", "error", "created_at", "started_at",
+    "finished_at", "version",
+)
+
+
+class ImportJob:
+    """Bitta fon import vazifasi va uning progress holati"""
+
+    def __init__(self, filename: str, file_size: int = None, file_hash: str = None):
+        self.id = str(uuid.uuid4())
+        self.filename = filename
+        self.file_size = file_size
+        self.file_hash = file_hash
+        self.status = "queued"      # queued | running | completed | failed
+        self.stage = "queued"       # queued | reading | cleaning | inserting | done
+        self.total_rows = None      # taxminiy qatorlar soni (ma'lum bo'lsa)
+        self.rows_read = 0
+        self.rows_cleaned = 0
+        self.rows_inserted = 0
+        self.batches = 0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # Har o'zgarishda oshadi - SSE faqat yangilanishni yuboradi
+        self.version = 0
+
+    def update_progress(self, stage: str, stats: dict):
+        """ExcelProcessor pipeline idan progress qabul qilish (worker thread larda chaqiriladi)"""
+        self.stage = stage
+        self.total_rows = stats.get("total_rows") or self.total_rows
+        self.rows_read = stats["read"]["rows"]
+        self.rows_cleaned = stats["clean"]["rows"]
+        self.rows_inserted = stats["insert"]["rows"]
+        self.batches = stats["batches"]
+        self.version += 1
+
+    @classmethod
+    def from_state(cls, state: ImportJobState) -> "ImportJob":
+        """Jadvaldagi holatdan (boshqa worker boshlagan vazifa)"""
+        job = cls.__new__(cls)
+        job.id = state.id
+        for field in STATE_FIELDS:
+            setattr(job, field, getattr(state, field))
+        job.result = json.loads(state.result) if state.result else None
+
+        # Worker to'xtagan - vazifa hech qachon tugamaydi
+        if job.status in ("queued", "running") and \
+                time.time() - (state.updated_at or state.created_at) > JOB_STALE_SECONDS:
+            job.status = "failed"
+            job.stage = "done"
+            job.error = "Import worker to'xtab qolgan (heartbeat yo'q)"
+            job.finished_at = state.updated_at
+        return job
+
+    def to_row(self) -> dict:
+        """import_jobs jadvaliga yoziladigan qiymatlar"""
+        row = {field: getattr(self, field) for field in STATE_FIELDS}
+        row["filename"] = (self.filename or "")[:255]
+        row["result"] = json.dumps(self.result, default=str) if self.result is not None else None
+        row["updated_at"] = time.time()
+        return row
+
+    def eta_seconds(self):
+        """Qolgan vaqt taxmini (yozish tezligi bo'yicha)"""
+        if self.status != "running" or not self.total_rows or not self.rows_inserted:
+            return None
+        elapsed = time.time() - self.started_at
+        rate = self.rows_inserted / elapsed
+        remaining = max(self.total_rows - self.rows_inserted, 0)
+        return round(remaining / rate, 1)
+
+    def to_dict(self) -> dict:
+        end = self.finished_at or time.time()
+        progress = None
+        if self.total_rows:
+            progress = round(min(self.rows_inserted / self.total_rows, 1.0) * 100, 1)
+        if self.status == "completed":
+            progress = 100.0
+
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "file_size": self.file_size,
+            "sha256": self.file_hash,
+            "status": self.status,
+            "stage": self.stage,
+            "total_rows": self.total_rows,
+            "rows_read": self.rows_read,
+            "rows_cleaned": self.rows_cleaned,
+            "rows_inserted": self.rows_inserted,
+            "batches": self.batches,
+            "progress": progress,
+            "eta_seconds": self.eta_seconds(),
+            "elapsed_seconds": round(end - self.started_at, 2) if self.started_at else 0,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class ImportJobManager:
+    """Import vazifalarini ro'yxatga olish va fonda bajarish
+
+    Holat import_jobs jadvalida: vazifani boshlagan worker uni xotirada yangilaydi va
+    JOB_PERSIST_SECONDS da bir yozadi, qolgan worker lar (uvicorn/gunicorn --workers)
+    status va SSE ni jadvaldan o'qiydi. Yozuvlar version bo'yicha - kechikkan yozuv
+    yangi holat ustiga tushmaydi.
+    """
+
+    def __init__(self, max_finished: int = 200):
+        # Shu process da ishlayotgan vazifalar
+        self.jobs = {}
+        # Tugagan vazifalar ko'rib chiqish uchun saqlanadi (eng eskilari o'chiriladi)
+        self.max_finished = max_finished
+        self._tasks = set()
+
+    def create(self, filename: str, file_size: int = None, file_hash: str = None) -> ImportJob:
+        """Yangi vazifa (database ga yoziladi - threadpool da chaqiriladi)"""
+        job = ImportJob(filename, file_size, file_hash)
+        db = SessionLocal()
+        try:
+            db.add(ImportJobState(id=job.id, **job.to_row()))
+            db.commit()
+            self._trim(db)
+        finally:
+            db.close()
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str):
+        job = self.jobs.get(job_id)
+        if job:
+            return job
+        db = SessionLocal()
+        try:
+            state = db.get(ImportJobState, job_id)
+            return ImportJob.from_state(state) if state else None
+        finally:
+            db.close()
+
+    def list(self, limit: int = 50) -> list:
+        db = SessionLocal()
+        try:
+            states = db.query(ImportJobState)\
+                       .order_by(ImportJobState.created_at.desc())\
+                       .limit(limit).all()
+            return [(self.jobs.get(state.id) or ImportJob.from_state(state)).to_dict() for state in states]
+        finally:
+            db.close()
+
+    def save(self, job_id: str, row: dict):
+        """Holatni yozish - faqat jadvaldagi version eskiroq (yoki teng) bo'lsa"""
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(ImportJobState)
+                .where(ImportJobState.id == job_id, ImportJobState.version <= row["version"])
+                .values(**row)
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ Import vazifa holati saqlanmadi {job_id}: {str(e)}")
+        finally:
+            db.close()
+
+    async def persist(self, job: ImportJob):
+        # Qiymatlar event loop da olinadi, yozish - threadpool da
+        row = job.to_row()
+        await asyncio.get_running_loop().run_in_executor(None, self.save, job.id, row)
+
+    def start(self, job: ImportJob, run, cleanup=None):
+        """run(job) korutinasini fonda ishga tushirish; natija dict bo'lishi kerak"""
+        task = asyncio.create_task(self._run(job, run, cleanup))
+        # Task GC bo'lib ketmasligi uchun havolani saqlash
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(self, job: ImportJob, run, cleanup):
+        job.status = "running"
+        job.stage = "reading"
+        job.started_at = time.time()
+        job.version += 1
+        logger.info(f"🚀 Import vazifa boshlandi: {job.id} ({job.filename})")
+        await self.persist(job)
+        flusher = asyncio.create_task(self._flush(job))
+
+        try:
+            result = await run(job)
+            job.result = result
+            if result.get("success"):
+                job.status = "completed"
+            else:
+                job.status = "failed"
+                job.error = result.get("error")
+        except Exception as e:
+            logger.error(f"❌ Import vazifa xatolik {job.id}: {str(e)}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            flusher.cancel()
+            job.stage = "done"
+            job.finished_at = time.time()
+            job.version += 1
+            if cleanup:
+                cleanup()
+            await self.persist(job)
+            self.jobs.pop(job.id, None)
+            logger.info(f"🏁 Import vazifa tugadi: {job.id} - {job.status}")
+
+    async def _flush(self, job: ImportJob):
+        """Progress ni davriy yozish (o'zgarmasa ham heartbeat)"""
+        saved_version, saved_at = job.version, time.time()
+        while True:
+            await asyncio.sleep(JOB_PERSIST_SECONDS)
+            if job.version != saved_version or time.time() - saved_at >= JOB_HEARTBEAT_SECONDS:
+                saved_version, saved_at = job.version, time.time()
+                await self.persist(job)
+
+    def _trim(self, db):
+        finished = db.query(ImportJobState.id)\
+                     .filter(ImportJobState.status.in_(("completed", "failed")))\
+                     .order_by(ImportJobState.created_at.desc())\
+                     .offset(self.max_finished).all()
+        if finished:
+            db.query(ImportJobState)\
+              .filter(ImportJobState.id.in_([row.id for row in finished]))\
+              .delete(synchronize_session=False)
+            db.commit()
+
+
+job_manager = ImportJobManager()
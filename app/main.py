@@ -1,20 +1,52 @@
 from fastapi import FastAPI, File, UploadFile, Depends, Request, HTTPException, Form
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, distinct
+from sqlalchemy import func, select
 from typing import List, Optional
 import aiofiles
 import os
 import csv
 import io
+from contextlib import asynccontextmanager
 from datetime import datetime
-from app.database import get_db, TradeRecord
+from app.database import (
+    get_db, get_read_db, ReadSessionLocal, TradeRecord, get_database_info, get_pool_stats,
+    bump_data_version, star_schema
+)
 from app.excel_processor import ExcelProcessor
+from app.import_jobs import job_manager
+from app.text_search import substring_filter, get_search_backend
+from app.star_schema import name_filters, aggregate_facts
+from app.schema import DB_AUTO_INIT, init_database
+from app import rollups, dedupe, maintenance
+from app.snapshots import snapshots
+from app.hs_tree import HS_LEVELS, LEVEL_BY_LENGTH
+from app.product_search import SUGGEST_MAX_LIMIT
+from app.responses import check_layout, shape_rows, data_response
+from app.columnar_export import COLUMNAR_FORMATS, ROW_GROUP_ROWS, iter_columnar_export
+import asyncio
+import base64
+import hashlib
+import json
 import uuid
+import zlib
 
-app = FastAPI(title="Excel Import Tizimi", description="IMRS ga o'xshash tez Excel import qilish tizimi")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Import paytida database ga ulanilmaydi - sxema faqat shu yerda (yoki init_db.py da)
+    if DB_AUTO_INIT:
+        init_database()
+    else:
+        print("📦 DB_AUTO_INIT o'chiq - sxema init_db.py bilan yaratilgan deb hisoblanadi")
+    yield
+
+app = FastAPI(
+    title="Excel Import Tizimi",
+    description="IMRS ga o'xshash tez Excel import qilish tizimi",
+    lifespan=lifespan
+)
 
 # Static fayllar va templatelar
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
@@ -23,9 +55,15 @@ templates = Jinja2Templates(directory="app/templates")
 # Upload papka
 UPLOAD_DIR = "/tmp/uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+MAX_UPLOAD_SIZE = 100 * 1024 * 1024  # 100MB
 
 excel_processor = ExcelProcessor()
 
+# Database ga sinxron murojaat qiladigan endpointlar oddiy `def` - FastAPI ularni
+# threadpool da bajaradi, og'ir so'rov event loop ni (va boshqa so'rovlarni) to'smaydi.
+# `async def` endpointlar faqat xotiradagi snapshot lar yoki await qilinadigan I/O bilan ishlaydi.
+
 @app.get("/home", response_class=HTMLResponse)
 async def home_page(request: Request):
     """Home import sahifasi"""
@@ -46,31 +84,78 @@ async def admin_page(request: Request):
 
 @app.post("/upload-excel")
 async def upload_excel(file: UploadFile = File(...)):
-    """Excel faylni yuklash va import qilish"""
-    
-    if not file.filename.endswith(('.xlsx', '.xls')):
-        raise HTTPException(status_code=400, detail="Faqat Excel fayl (.xlsx, .xls) yuklash mumkin")
+    """Excel/CSV/Parquet faylni (yoki ularning .zip arxivini) yuklash va import qilish"""
     
-    if file.size > 100 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="Fayl hajmi 100MB dan oshmasligi kerak")
+    if not file.filename.lower().endswith(ExcelProcessor.SUPPORTED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Faqat .xlsx, .xls, .csv, .parquet yoki .zip fayl yuklash mumkin")
     
+    file_path = None
     try:
         file_id = str(uuid.uuid4())
         file_path = os.path.join(UPLOAD_DIR, f"{file_id}_{file.filename}")
         
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        # Faylni bo'laklab diskka yozish (hajm chegarasi va hash yozish paytida)
+        file_size, file_hash = await save_upload(file, file_path)
         
-        result = await excel_processor.process_excel_file(file_path)
+        # Import fonda bajariladi - javob darhol job_id bilan qaytadi
+        job = await asyncio.get_running_loop().run_in_executor(
+            None, job_manager.create, file.filename, file_size, file_hash
+        )
         
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        async def run_import(job):
+            loop = asyncio.get_running_loop()
+            # Bir xil fayl (sha256) qayta import qilinmaydi
+            imported = await loop.run_in_executor(None, excel_processor.find_imported_file, file_hash)
+            if imported:
+                return {
+                    "success": True,
+                    "skipped": True,
+                    "total_records": 0,
+                    "inserted_records": 0,
+                    "message": f"ℹ️ Bu fayl {imported.imported_at:%Y-%m-%d %H:%M} da import qilingan ({imported.filename}), qayta yozilmadi"
+                }
+            
+            # Fayl turiga qarab o'quvchi tanlanadi (.zip - ichidagi fayllar ketma-ket)
+            result = await excel_processor.process_file(file_path, progress=job.update_progress)
+            
+            # Batch delta lari aniq bo'lmagan bo'lsa rollup larni qayta hisoblash
+            await loop.run_in_executor(None, rollups.refresh_if_stale)
+            if result.get("inserted_records"):
+                await loop.run_in_executor(None, refresh_snapshots, True)
+            
+            if result.get("success"):
+                await loop.run_in_executor(
+                    None, excel_processor.mark_file_imported,
+                    file_hash, file.filename, file_size, result["inserted_records"]
+                )
+            return result
+        
+        def remove_upload():
+            if os.path.exists(file_path):
+                os.remove(file_path)
         
-        return JSONResponse(content=result)
+        job_manager.start(job, run_import, cleanup=remove_upload)
+        
+        return JSONResponse(
+            status_code=202,
+            content={
+                "success": True,
+                "job_id": job.id,
+                "status_url": f"/api/import-jobs/{job.id}",
+                "events_url": f"/api/import-jobs/{job.id}/events",
+                "file_size": file_size,
+                "sha256": file_hash,
+                "message": "Fayl qabul qilindi, import fonda bajarilmoqda"
+            }
+        )
+        
+    except HTTPException:
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+        raise
         
     except Exception as e:
-        if os.path.exists(file_path):
+        if file_path and os.path.exists(file_path):
             os.remove(file_path)
         
         return JSONResponse(
@@ -78,114 +163,279 @@ async def upload_excel(file: UploadFile = File(...)):
             content={"success": False, "error": str(e)}
         )
 
+async def save_upload(file: UploadFile, file_path: str):
+    """Upload ni UPLOAD_CHUNK_SIZE bo'laklarda diskka yozish, (hajm, sha256) qaytaradi"""
+    sha256 = hashlib.sha256()
+    size = 0
+    
+    async with aiofiles.open(file_path, 'wb') as f:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            
+            size += len(chunk)
+            if size > MAX_UPLOAD_SIZE:
+                raise HTTPException(status_code=413, detail="Fayl hajmi 100MB dan oshmasligi kerak")
+            
+            sha256.update(chunk)
+            await f.write(chunk)
+    
+    return size, sha256.hexdigest()
+
+@app.get("/api/import-jobs")
+def list_import_jobs(limit: int = 50):
+    """Oxirgi import vazifalari ro'yxati"""
+    return {"success": True, "jobs": job_manager.list(limit)}
+
+@app.get("/api/import-jobs/{job_id}")
+def get_import_job(job_id: str):
+    """Import vazifasi holati: bosqich, o'qilgan/tozalangan/yozilgan qatorlar, ETA"""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import vazifasi topilmadi")
+    return {"success": True, **job.to_dict()}
+
+@app.get("/api/import-jobs/{job_id}/events")
+async def import_job_events(job_id: str):
+    """Import progressini Server-Sent Events orqali uzatish"""
+    loop = asyncio.get_running_loop()
+    job = await loop.run_in_executor(None, job_manager.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import vazifasi topilmadi")
+    
+    async def event_stream():
+        job_state = job
+        last_version = -1
+        while True:
+            if job_state.version != last_version:
+                last_version = job_state.version
+                yield f"data: {json.dumps(job_state.to_dict())}\n\n"
+            if job_state.finished_at:
+                break
+            await asyncio.sleep(0.5)
+            # Vazifa boshqa worker da bo'lishi mumkin - holat jadvaldan qayta o'qiladi
+            job_state = await loop.run_in_executor(None, job_manager.get, job_id) or job_state
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # === ANALYTICS ENDPOINTS ===
 
+# Bitta so'rovda qaytariladigan qatorlar chegarasi
+TRADE_DATA_MAX_LIMIT = 5000
+GET_DATA_DEFAULT_LIMIT = 2000
+GET_DATA_MAX_LIMIT = 10000
+
+# Javob maydoni -> SELECT ustuni (faqat shular o'qiladi, NULL o'lchovlar 0)
+TRADE_DATA_FIELDS = {
+    "id": TradeRecord.id,
+    "country": TradeRecord.trading_partner,
+    "product_name": TradeRecord.product_name,
+    "hs_code": TradeRecord.hs_10_code,
+    "year": TradeRecord.year,
+    "import_volume": func.coalesce(TradeRecord.import_volume, 0),
+    "import_price": func.coalesce(TradeRecord.import_price, 0),
+    "export_volume": func.coalesce(TradeRecord.export_volume, 0),
+    "export_price": func.coalesce(TradeRecord.export_price, 0),
+    "measure": TradeRecord.measure,
+    "hs_group": TradeRecord.hs_group,
+}
+TRADE_DATA_DICTIONARY_FIELDS = ("country", "product_name", "hs_code", "measure", "hs_group")
+GET_DATA_FIELDS = {
+    "country": TradeRecord.trading_partner,
+    "name": TradeRecord.product_name,
+    "code": TradeRecord.hs_10_code,
+    "year": TradeRecord.year,
+    "import_volume": func.coalesce(TradeRecord.import_volume, 0),
+    "import_price": func.coalesce(TradeRecord.import_price, 0),
+    "export_volume": func.coalesce(TradeRecord.export_volume, 0),
+    "export_price": func.coalesce(TradeRecord.export_price, 0),
+    "measure": TradeRecord.measure,
+    "hs_group": TradeRecord.hs_group,
+}
+GET_DATA_DICTIONARY_FIELDS = ("country", "name", "code", "measure", "hs_group")
+
+def encode_cursor(last_id: int) -> str:
+    """Sahifa oxirgi id sidan shaffof bo'lmagan cursor token"""
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, last_id = base64.urlsafe_b64decode(padded).decode().split(":")
+        if prefix != "id":
+            raise ValueError(prefix)
+        return int(last_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Noto'g'ri cursor")
+
+async def ensure_snapshots():
+    """Snapshot qurilmagan yoki versiya tekshiruvi vaqti kelgan bo'lsa - event loop ni to'smasdan threadpool da"""
+    if not snapshots.ready or snapshots.check_due:
+        await asyncio.get_running_loop().run_in_executor(None, snapshots.ensure)
+
 @app.get("/api/filter-options")
-async def get_filter_options(db: Session = Depends(get_db)):
+async def get_filter_options(request: Request):
+    """Filtr variantlari - xotiradagi snapshot dan (ma'lumot o'zgarganda qayta quriladi)"""
     try:
-        # Countries
-        countries_raw = db.query(distinct(TradeRecord.trading_partner))\
-                     .filter(TradeRecord.trading_partner.isnot(None))\
-                     .order_by(TradeRecord.trading_partner)\
-                     .all()
-        
-        countries = [c[0] for c in countries_raw if c[0] and c[0].strip()]
-
-        # Products - JAMI sonini hisoblash
-        total_products_count = db.query(func.count(distinct(TradeRecord.product_name)))\
-                             .filter(TradeRecord.product_name.isnot(None)).scalar()
-
-        # Faqat birinchi 1000 ta mahsulotni olish (tezlik uchun)
-        products_raw = db.query(
-            TradeRecord.product_name,
-            TradeRecord.hs_10_code,
-            TradeRecord.hs_6_code
-        ).filter(TradeRecord.product_name.isnot(None))\
-         .distinct()\
-         .limit(1000)\
-         .all()
-        
-        products = []
-        for p in products_raw:
-            if p[0] and p[0].strip():
-                products.append({
-                    "name": p[0],
-                    "product_name": p[0],
-                    "hs_10_code": p[1],
-                    "hs_6_code": p[2]
-                })
-
-        # Years
-        years_raw = db.query(distinct(TradeRecord.year))\
-                 .filter(TradeRecord.year > 1990)\
-                 .order_by(TradeRecord.year.desc())\
-                 .all()
-        
-        years = [y[0] for y in years_raw if y[0]]
+        await ensure_snapshots()
+        
+        # Versiya o'zgarmagan bo'lsa brauzer keshidagi javob ishlatiladi
+        version, body = snapshots.filter_options_json
+        etag = f'"{version}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers={"ETag": etag, "Cache-Control": "no-cache"}
+        )
+        
+    except Exception as e:
+        return {"success": False, "error": str(e)}
 
+@app.get("/api/db-status")
+def get_db_status():
+    """Database turi, saqlash rejimi va connection pool holati"""
+    try:
         return {
             "success": True,
-            "countries": countries,
-            "products": products,
-            "years": years,
-            "pagination": {
-                "total": total_products_count,  # Jami mahsulotlar soni
-                "loaded": len(products),        # Yuklangan mahsulotlar soni
-                "has_more": len(products) < total_products_count
-            }
+            "database": get_database_info(),
+            "search_backend": get_search_backend(),
+            "pool": get_pool_stats()
+        }
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"success": False, "error": str(e)})
+
+@app.get("/api/data-version")
+async def get_data_version():
+    """Joriy ma'lumot versiyasi - o'zgarmagan bo'lsa mijoz qayta so'ramasligi mumkin"""
+    try:
+        await ensure_snapshots()
+        return {"success": True, **snapshots.info()}
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"success": False, "error": str(e)})
+
+@app.get("/api/hs-tree")
+async def get_hs_tree(parent: Optional[str] = None, level: Optional[str] = None):
+    """HS ierarxiyasi bo'yicha bosqichma-bosqich ko'rish: parent berilmasa - HS-2 bo'limlar"""
+    try:
+        await ensure_snapshots()
+        tree = snapshots.get_hs_tree()
+        
+        if parent is None:
+            level = None
+        else:
+            # parent darajasi (hs_2 / hs_4 / hs_6) - berilmasa kod uzunligidan
+            level = level or LEVEL_BY_LENGTH.get(len(parent))
+            if level not in HS_LEVELS:
+                raise HTTPException(status_code=400, detail="Noto'g'ri HS daraja")
+        
+        node = tree.get(level, parent)
+        if node is None:
+            raise HTTPException(status_code=404, detail=f"HS kod topilmadi: {parent}")
+        
+        return {
+            "success": True,
+            "data_version": snapshots.version,
+            "node": tree.to_dict(node),
+            "level": tree.child_level(level),
+            "children": tree.children(level, parent)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        return JSONResponse(status_code=500, content={"success": False, "error": str(e)})
+
+@app.get("/api/products/suggest")
+async def suggest_products(q: str = "", limit: int = 20):
+    """Mahsulot nomi so'zlari yoki HS-10 kod prefiksi bo'yicha avtoto'ldirish"""
+    try:
+        await ensure_snapshots()
+        limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+        results = snapshots.get_product_index().suggest(q, limit)
+        
+        return {
+            "success": True,
+            "data_version": snapshots.version,
+            "query": q,
+            "products": results
+        }
+        
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"success": False, "error": str(e)})
+
+def refresh_snapshots(bump_version: bool = False):
+    """Import, dedupe yoki tozalashdan keyin xotiradagi snapshot larni yangilash
+
+    bump_version - ma'lumot versiyasi hali oshirilmagan (import): boshqa process lar ham qayta quradi.
+    """
+    try:
+        if bump_version:
+            bump_data_version()
+        snapshots.rebuild()
+    except Exception as e:
+        print(f"⚠️ Snapshot yangilanmadi: {e}")
     
 @app.get("/api/trade-data")
-async def get_trade_data(
+def get_trade_data(
+    request: Request,
     country: Optional[str] = None,
     product: Optional[str] = None, 
     year: Optional[int] = None,
     limit: int = 1000,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    layout: str = "rows",
+    db: Session = Depends(get_read_db)
 ):
-    """Filtrlangan savdo ma'lumotlarini olish"""
+    """Filtrlangan savdo ma'lumotlarini olish (eng yangisidan, id bo'yicha keyset sahifalash)"""
     try:
-        query = db.query(TradeRecord)
+        limit = max(1, min(limit, TRADE_DATA_MAX_LIMIT))
+        check_layout(layout)
+        conditions = []
+        
+        # Keyingi sahifa - oldingi sahifaning oxirgi id sidan kichiklar
+        if cursor:
+            conditions.append(TradeRecord.id < decode_cursor(cursor))
         
         # Filtrlar qo'llash
         if country:
-            query = query.filter(TradeRecord.trading_partner.ilike(f"%{country}%"))
+            conditions.append(substring_filter(TradeRecord.trading_partner, country))
         
         if product:
-            query = query.filter(TradeRecord.product_name.ilike(f"%{product}%"))
+            conditions.append(substring_filter(TradeRecord.product_name, product))
             
         if year:
-            query = query.filter(TradeRecord.year == year)
-        
-        # Ma'lumotlarni olish
-        records = query.order_by(TradeRecord.created_at.desc()).limit(limit).all()
-        
-        # JSON formatga o'tkazish
-        data = []
-        for record in records:
-            data.append({
-                "id": record.id,
-                "country": record.trading_partner,
-                "product_name": record.product_name,
-                "hs_code": record.hs_10_code,
-                "year": record.year,
-                "import_volume": record.import_volume or 0,
-                "import_price": record.import_price or 0,
-                "export_volume": record.export_volume or 0,
-                "export_price": record.export_price or 0,
-                "measure": record.measure,
-                "hs_group": record.hs_group
-            })
-        
-        return {
+            conditions.append(TradeRecord.year == year)
+        
+        # Faqat javobdagi ustunlar (ORM obyekt emas) - id indeksli, created_at bilan bir xil tartib
+        rows = db.execute(
+            select(*TRADE_DATA_FIELDS.values())
+            .where(*conditions)
+            .order_by(TradeRecord.id.desc())
+            .limit(limit + 1)
+        ).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        # Katta javob shu thread da kodlanadi (event loop da emas)
+        return data_response(request, {
             "success": True,
-            "records": data,
-            "total": len(data)
-        }
-        
+            "layout": layout,
+            "records": shape_rows(tuple(TRADE_DATA_FIELDS), rows, layout, TRADE_DATA_DICTIONARY_FIELDS),
+            "total": len(rows),
+            "has_more": has_more,
+            "next_cursor": encode_cursor(rows[-1][0]) if has_more else None
+        })
+        
+    except HTTPException:
+        raise
     except Exception as e:
         return {
             "success": False,
@@ -195,50 +445,55 @@ async def get_trade_data(
         }
 
 @app.post("/api/get-data")
-async def get_filtered_data(
+def get_filtered_data(
+    request: Request,
     countries: List[str] = Form(...),
     products: List[str] = Form(...), 
     years: List[int] = Form(...),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Form(None),
+    limit: int = Form(GET_DATA_DEFAULT_LIMIT),
+    layout: str = Form("rows"),
+    db: Session = Depends(get_read_db)
 ):
-    """Tanlangan parametrlar bo'yicha ma'lumot olish"""
+    """Tanlangan parametrlar bo'yicha ma'lumot olish (id bo'yicha keyset sahifalash)"""
     try:
-        query = db.query(TradeRecord)
+        limit = max(1, min(limit, GET_DATA_MAX_LIMIT))
+        check_layout(layout)
+        conditions = []
         
-        # Filtrlar
-        if countries:
-            query = query.filter(TradeRecord.trading_partner.in_(countries))
+        if cursor:
+            conditions.append(TradeRecord.id > decode_cursor(cursor))
         
-        if products:
-            query = query.filter(TradeRecord.product_name.in_(products))
+        # Filtrlar (star rejimda nomlar oldindan lug'at id lariga)
+        conditions += name_filters(db, countries, products)
             
         if years:
-            query = query.filter(TradeRecord.year.in_(years))
-        
-        records = query.all()
-        
-        # Formatted data
-        data = []
-        for record in records:
-            data.append({
-                "country": record.trading_partner,
-                "name": record.product_name,
-                "code": record.hs_10_code,
-                "year": record.year,
-                "import_volume": record.import_volume or 0,
-                "import_price": record.import_price or 0, 
-                "export_volume": record.export_volume or 0,
-                "export_price": record.export_price or 0,
-                "measure": record.measure,
-                "hs_group": record.hs_group
-            })
-        
-        return {
+            conditions.append(TradeRecord.year.in_(years))
+        
+        # id - faqat cursor uchun, javobga kirmaydi
+        rows = db.execute(
+            select(TradeRecord.id, *GET_DATA_FIELDS.values())
+            .where(*conditions)
+            .order_by(TradeRecord.id)
+            .limit(limit + 1)
+        ).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        last_id = rows[-1][0] if rows else None
+        rows = [row[1:] for row in rows]
+        
+        # Katta javob shu thread da kodlanadi (event loop da emas)
+        return data_response(request, {
             "success": True,
-            "data": data,
-            "message": f"{len(data)} ta record topildi"
-        }
-        
+            "layout": layout,
+            "data": shape_rows(tuple(GET_DATA_FIELDS), rows, layout, GET_DATA_DICTIONARY_FIELDS),
+            "has_more": has_more,
+            "next_cursor": encode_cursor(last_id) if has_more else None,
+            "message": f"{len(rows)} ta record topildi"
+        })
+        
+    except HTTPException:
+        raise
     except Exception as e:
         return {
             "success": False,
@@ -246,165 +501,233 @@ async def get_filtered_data(
             "data": []
         }
     
+# Agregatsiya: ruxsat etilgan guruhlash o'lchovlari va yig'indilar
+AGGREGATE_DIMENSIONS = {
+    "year": TradeRecord.year,
+    "partner": TradeRecord.trading_partner,
+    "product": TradeRecord.product_name,
+    "hs_2": TradeRecord.hs_2_code,
+    "hs_4": TradeRecord.hs_4_code,
+    "hs_6": TradeRecord.hs_6_code,
+    "hs_group": TradeRecord.hs_group,
+}
+AGGREGATE_MEASURES = {
+    "import_volume": TradeRecord.import_volume,
+    "import_price": TradeRecord.import_price,
+    "export_volume": TradeRecord.export_volume,
+    "export_price": TradeRecord.export_price,
+}
+AGGREGATE_MAX_GROUPS = 10000
+
+@app.post("/api/aggregate")
+def aggregate_data(
+    group_by: List[str] = Form([]),
+    measures: List[str] = Form([]),
+    countries: List[str] = Form([]),
+    products: List[str] = Form([]),
+    years: List[int] = Form([]),
+    db: Session = Depends(get_read_db)
+):
+    """Filtrlangan ma'lumotni SQL GROUP BY bilan yig'ish - ustunli (series) javob"""
+    measures = measures or list(AGGREGATE_MEASURES)
+    
+    unknown = [g for g in group_by if g not in AGGREGATE_DIMENSIONS] + \
+              [m for m in measures if m not in AGGREGATE_MEASURES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Noma'lum o'lchov: {', '.join(unknown)}")
+    
+    try:
+        if star_schema:
+            # Fakt jadvali integer kalitlar bo'yicha guruhlanadi, nomlar natijaga qo'shiladi
+            query = aggregate_facts(db, group_by, measures, countries, products, years)
+            rows = db.execute(query.limit(AGGREGATE_MAX_GROUPS + 1)).all()
+        else:
+            rows = aggregate_records(db, group_by, measures, countries, products, years)
+        truncated = len(rows) > AGGREGATE_MAX_GROUPS
+        rows = rows[:AGGREGATE_MAX_GROUPS]
+        
+        # Ustunli format: har o'lchov va yig'indi uchun bitta massiv
+        names = group_by + ["count"] + measures
+        columns = list(zip(*rows)) if rows else [()] * len(names)
+        series = {name: [float(v) for v in values] if name in AGGREGATE_MEASURES
+                  else [int(v) for v in values] if name == "count" else list(values)
+                  for name, values in zip(names, columns)}
+        
+        # Katta javob JSON ga shu thread da o'giriladi (event loop da emas)
+        return JSONResponse(content={
+            "success": True,
+            "group_by": group_by,
+            "measures": measures,
+            "rows": len(rows),
+            "truncated": truncated,
+            "series": series
+        })
+        
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"success": False, "error": str(e)})
+
+def aggregate_records(db, group_by: list, measures: list, countries: list, products: list, years: list) -> list:
+    """Flat rejim: trade_records ustunlari bo'yicha GROUP BY (AGGREGATE_MAX_GROUPS + 1 tagacha)"""
+    dimensions = [AGGREGATE_DIMENSIONS[g] for g in group_by]
+    query = db.query(
+        *dimensions,
+        func.count(TradeRecord.id),
+        *[func.coalesce(func.sum(AGGREGATE_MEASURES[m]), 0) for m in measures]
+    )
+    
+    # Filtrlar (/api/get-data bilan bir xil)
+    for condition in name_filters(db, countries, products):
+        query = query.filter(condition)
+    if years:
+        query = query.filter(TradeRecord.year.in_(years))
+    
+    if dimensions:
+        query = query.group_by(*dimensions).order_by(*dimensions)
+    return query.limit(AGGREGATE_MAX_GROUPS + 1).all()
+
+# Eksport ustunlari (ORM obyekt emas - tuple lar)
+EXPORT_COLUMNS = (
+    TradeRecord.trading_partner,
+    TradeRecord.product_name,
+    TradeRecord.hs_10_code,
+    TradeRecord.year,
+    TradeRecord.import_volume,
+    TradeRecord.import_price,
+    TradeRecord.export_volume,
+    TradeRecord.export_price,
+    TradeRecord.measure,
+    TradeRecord.hs_group,
+)
+EXPORT_HEADER = [
+    'Davlat', 'Mahsulot', 'HS Kod', 'Yil', 'Import Hajmi', 'Import Qiymati ($)',
+    'Export Hajmi', 'Export Qiymati ($)', 'O\'lchov', 'HS Guruh'
+]
+# Server-side cursor dan bir marta olinadigan va bitta bo'lak sifatida yuboriladigan qatorlar
+EXPORT_CHUNK_ROWS = 5000
+
 @app.get("/api/export-data")
-async def export_data(
+def export_data(
     country: Optional[str] = None,
     product: Optional[str] = None,
     year: Optional[int] = None, 
     format: str = "csv",
-    db: Session = Depends(get_db)
+    gzip: bool = False
 ):
-    """Ma'lumotlarni eksport qilish"""
+    """Ma'lumotlarni eksport qilish (oqim sifatida): csv (ixtiyoriy gzip), parquet, arrow
+
+    Oddiy `def` - substring_filter birinchi chaqiruvda qidiruv usulini database dan aniqlaydi.
+    """
+    if format != "csv" and format not in COLUMNAR_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Qo'llab-quvvatlanadigan formatlar: csv, {', '.join(COLUMNAR_FORMATS)}"
+        )
+    
     try:
-        query = db.query(TradeRecord)
-        
+        conditions = []
         if country:
-            query = query.filter(TradeRecord.trading_partner.ilike(f"%{country}%"))
+            conditions.append(substring_filter(TradeRecord.trading_partner, country))
         if product:
-            query = query.filter(TradeRecord.product_name.ilike(f"%{product}%"))
+            conditions.append(substring_filter(TradeRecord.product_name, product))
         if year:
-            query = query.filter(TradeRecord.year == year)
-            
-        records = query.all()
+            conditions.append(TradeRecord.year == year)
         
         if format == "csv":
-            return export_as_csv(records)
-        else:
-            raise HTTPException(status_code=400, detail="Faqat CSV format qo'llab-quvvatlanadi")
+            return export_as_csv(conditions, compress=gzip)
+        return export_as_columnar(conditions, format)
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-def export_as_csv(records):
-    """CSV formatda eksport"""
-    output = io.StringIO()
-    writer = csv.writer(output)
+def iter_export_rows(conditions, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Filtrlangan qatorlarni server-side cursor orqali bo'laklab o'qish"""
+    # Oqim javob tugaguncha yashaydigan alohida session
+    db = ReadSessionLocal()
+    try:
+        query = select(*EXPORT_COLUMNS).where(*conditions)\
+                  .execution_options(stream_results=True, yield_per=chunk_rows)
+        for partition in db.execute(query).partitions():
+            yield partition
+    finally:
+        db.close()
+
+def export_as_csv(conditions, compress: bool = False):
+    """CSV formatda eksport - har EXPORT_CHUNK_ROWS qator kodlanib darhol yuboriladi"""
     
-    # Header
-    writer.writerow([
-        'Davlat', 'Mahsulot', 'HS Kod', 'Yil', 'Import Hajmi', 'Import Qiymati ($)', 
-        'Export Hajmi', 'Export Qiymati ($)', 'O\'lchov', 'HS Guruh'
-    ])
+    def generate():
+        output = io.StringIO()
+        writer = csv.writer(output)
+        # gzip konteyner (wbits=31) - bo'laklar oqim davomida siqiladi
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        
+        def flush():
+            data = output.getvalue().encode()
+            output.seek(0)
+            output.truncate()
+            return compressor.compress(data) if compressor else data
+        
+        # Header - birinchi bayt darhol
+        writer.writerow(EXPORT_HEADER)
+        yield flush()
+        
+        # Data
+        for rows in iter_export_rows(conditions):
+            writer.writerows(
+                (partner, name, code, year,
+                 import_volume or 0, import_price or 0,
+                 export_volume or 0, export_price or 0,
+                 measure, hs_group)
+                for (partner, name, code, year, import_volume, import_price,
+                     export_volume, export_price, measure, hs_group) in rows
+            )
+            chunk = flush()
+            if chunk:
+                yield chunk
+        
+        if compressor:
+            yield compressor.flush()
     
-    # Data
-    for record in records:
-        writer.writerow([
-            record.trading_partner,
-            record.product_name, 
-            record.hs_10_code,
-            record.year,
-            record.import_volume or 0,
-            record.import_price or 0,
-            record.export_volume or 0, 
-            record.export_price or 0,
-            record.measure,
-            record.hs_group
-        ])
+    filename = "trade_data.csv.gz" if compress else "trade_data.csv"
+    response = StreamingResponse(
+        generate(),
+        media_type="application/gzip" if compress else "text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
     
-    output.seek(0)
+    return response
+
+def export_as_columnar(conditions, fmt: str):
+    """Parquet / Arrow IPC eksport - har ROW_GROUP_ROWS qator alohida row group (batch)"""
+    extension, media_type = COLUMNAR_FORMATS[fmt]
+    partitions = iter_export_rows(conditions, chunk_rows=ROW_GROUP_ROWS)
     
     response = StreamingResponse(
-        io.BytesIO(output.getvalue().encode()),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=trade_data.csv"}
+        iter_columnar_export(partitions, fmt),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=trade_data.{extension}"}
     )
     
     return response
+
 @app.delete("/api/remove-duplicates")
-async def remove_duplicates(db: Session = Depends(get_db)):
-    """Dublikat recordlarni tozalash"""
+def remove_duplicates(db: Session = Depends(get_db)):
+    """Dublikat recordlarni tozalash (faqat oxirgi tekshiruvdan keyingi qatorlar, bo'laklab)"""
     try:
-        # Dublikatlarni topish uchun CTE (Common Table Expression) ishlatamiz
-        from sqlalchemy import text
-        
-        # Birinchi, dublikatlarni aniqlash
-        duplicate_query = text("""
-            WITH duplicates AS (
-                SELECT 
-                    id,
-                    trading_partner,
-                    product_name,
-                    hs_10_code,
-                    year,
-                    import_volume,
-                    import_price,
-                    export_volume,
-                    export_price,
-                    measure,
-                    hs_group,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY 
-                            trading_partner,
-                            product_name,
-                            hs_10_code,
-                            year,
-                            COALESCE(import_volume, 0),
-                            COALESCE(import_price, 0),
-                            COALESCE(export_volume, 0),
-                            COALESCE(export_price, 0),
-                            COALESCE(measure, ''),
-                            COALESCE(hs_group, '')
-                        ORDER BY created_at ASC
-                    ) as row_num
-                FROM trade_records
-            )
-            SELECT COUNT(*) as duplicate_count
-            FROM duplicates 
-            WHERE row_num > 1
-        """)
-        
-        # Dublikatlar sonini hisoblash
-        result = db.execute(duplicate_query)
-        duplicate_count = result.fetchone()[0]
-        
-        if duplicate_count == 0:
-            return {
-                "success": True,
-                "message": "Dublikat recordlar topilmadi",
-                "removed_count": 0
-            }
-        
-        # Dublikatlarni o'chirish (eng eski recorddan tashqari hammasini)
-        delete_query = text("""
-            DELETE FROM trade_records 
-            WHERE id IN (
-                SELECT id FROM (
-                    SELECT 
-                        id,
-                        ROW_NUMBER() OVER (
-                            PARTITION BY 
-                                trading_partner,
-                                product_name,
-                                hs_10_code,
-                                year,
-                                COALESCE(import_volume, 0),
-                                COALESCE(import_price, 0),
-                                COALESCE(export_volume, 0),
-                                COALESCE(export_price, 0),
-                                COALESCE(measure, ''),
-                                COALESCE(hs_group, '')
-                            ORDER BY created_at ASC
-                        ) as row_num
-                    FROM trade_records
-                ) t
-                WHERE row_num > 1
-            )
-        """)
+        result = dedupe.remove_duplicates(db)
         
-        # O'chirish amaliyotini bajarish
-        delete_result = db.execute(delete_query)
-        db.commit()
-        
-        removed_count = delete_result.rowcount
+        # Rollup lar har bo'lakda o'chirilgan qatorlar bo'yicha yangilangan - snapshot faqat o'chirish bo'lsa
+        if result["removed_count"]:
+            refresh_snapshots()
         
+        removed_count = result["removed_count"]
         return {
             "success": True,
-            "message": f"{removed_count} ta dublikat record muvaffaqiyatli o'chirildi",
-            "removed_count": removed_count
+            "message": f"{removed_count} ta dublikat record muvaffaqiyatli o'chirildi" if removed_count
+                       else "Dublikat recordlar topilmadi",
+            **result
         }
         
     except Exception as e:
-        db.rollback()
         print(f"❌ Dublikatlarni o'chirishda xatolik: {e}")
         import traceback
         traceback.print_exc()
@@ -418,62 +741,24 @@ async def remove_duplicates(db: Session = Depends(get_db)):
             }
         )
 
+@app.get("/api/dedupe-status")
+async def get_dedupe_status():
+    """Dublikat tozalash jarayoni (ishlayotgan yoki oxirgi)"""
+    return {"success": True, **dedupe.progress.to_dict()}
+
 @app.get("/api/duplicate-stats")
-async def get_duplicate_stats(db: Session = Depends(get_db)):
-    """Dublikatlar statistikasini olish"""
+def get_duplicate_stats(db: Session = Depends(get_read_db)):
+    """Dublikatlar statistikasi (faqat hali tekshirilmagan qatorlar bo'yicha)"""
     try:
-        from sqlalchemy import text
-        
         # Jami recordlar soni
         total_records = db.query(TradeRecord).count()
-        
-        # Dublikatlar sonini hisoblash
-        duplicate_query = text("""
-            WITH duplicates AS (
-                SELECT 
-                    trading_partner,
-                    product_name,
-                    hs_10_code,
-                    year,
-                    COALESCE(import_volume, 0) as import_volume,
-                    COALESCE(import_price, 0) as import_price,
-                    COALESCE(export_volume, 0) as export_volume,
-                    COALESCE(export_price, 0) as export_price,
-                    COALESCE(measure, '') as measure,
-                    COALESCE(hs_group, '') as hs_group,
-                    COUNT(*) as duplicate_count
-                FROM trade_records
-                GROUP BY 
-                    trading_partner,
-                    product_name,
-                    hs_10_code,
-                    year,
-                    COALESCE(import_volume, 0),
-                    COALESCE(import_price, 0),
-                    COALESCE(export_volume, 0),
-                    COALESCE(export_price, 0),
-                    COALESCE(measure, ''),
-                    COALESCE(hs_group, '')
-                HAVING COUNT(*) > 1
-            )
-            SELECT 
-                COUNT(*) as duplicate_groups,
-                SUM(duplicate_count - 1) as total_duplicates
-            FROM duplicates
-        """)
-        
-        result = db.execute(duplicate_query)
-        stats = result.fetchone()
-        
-        duplicate_groups = stats[0] if stats[0] else 0
-        total_duplicates = stats[1] if stats[1] else 0
+        stats = dedupe.duplicate_stats(db)
         
         return {
             "success": True,
             "total_records": total_records,
-            "duplicate_groups": duplicate_groups,
-            "total_duplicates": total_duplicates,
-            "unique_records": total_records - total_duplicates
+            **stats,
+            "unique_records": total_records - stats["total_duplicates"]
         }
         
     except Exception as e:
@@ -490,36 +775,10 @@ async def get_duplicate_stats(db: Session = Depends(get_db)):
         )
         
 @app.get("/stats")
-async def get_stats(db: Session = Depends(get_db)):
-    """Database statistikasi"""
+def get_stats(db: Session = Depends(get_read_db)):
+    """Database statistikasi (rollup jadvallaridan - jadval hajmiga bog'liq emas, qayta hisoblamaydi)"""
     try:
-        total_records = db.query(TradeRecord).count()
-        
-        # Yil bo'yicha statistika
-        year_stats = db.query(
-            TradeRecord.year,
-            func.count(TradeRecord.id)
-        ).group_by(TradeRecord.year).all()
-        
-        # Davlatlar bo'yicha top 10
-        country_stats = db.query(
-            TradeRecord.trading_partner,
-            func.count(TradeRecord.id)
-        ).group_by(TradeRecord.trading_partner).order_by(
-            func.count(TradeRecord.id).desc()
-        ).limit(10).all()
-        
-        # Import/Export yig'indisi
-        import_total = db.query(func.sum(TradeRecord.import_price)).scalar() or 0
-        export_total = db.query(func.sum(TradeRecord.export_price)).scalar() or 0
-        
-        return {
-            "total_records": total_records,
-            "total_import_value": float(import_total),
-            "total_export_value": float(export_total),
-            "year_stats": [{"year": year, "count": count} for year, count in year_stats],
-            "country_stats": [{"country": country, "count": count} for country, count in country_stats]
-        }
+        return rollups.read_stats(db, top_countries=10)
         
     except Exception as e:
         return JSONResponse(
@@ -528,11 +787,11 @@ async def get_stats(db: Session = Depends(get_db)):
         )
 
 @app.delete("/clear-data")
-async def clear_all_data(db: Session = Depends(get_db)):
+def clear_all_data(db: Session = Depends(get_db)):
     """Barcha ma'lumotlarni o'chirish"""
     try:
-        deleted_count = db.query(TradeRecord).delete()
-        db.commit()
+        deleted_count = maintenance.clear_all_data(db)
+        refresh_snapshots()
         
         return {
             "success": True,
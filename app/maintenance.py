@@ -0,0 +1,22 @@
+from app import rollups, dedupe
+from app.database import FACT_MODEL, ImportedFile, bump_data_version
+from app.text_search import clear_search_terms
+
+
+def clear_all_data(db) -> int:
+    """Barcha ma'lumotlarni o'chirish - /clear-data va clear_database.py uchun bitta yo'l
+
+    Fakt qatorlari, rollup lar, dedupe watermark i, qidiruv qiymatlari va fayl fingerprint lari
+    bitta tranzaksiyada tozalanadi; data_version oshiriladi - boshqa process lar ham snapshot ni
+    qayta quradi. O'chirilgan qatorlar sonini qaytaradi (commit shu yerda).
+    """
+    # Star rejimda trade_records - VIEW, o'chirish fakt jadvalidan
+    deleted_count = db.query(FACT_MODEL).delete()
+    rollups.clear(db)
+    dedupe.clear(db)
+    clear_search_terms(db)
+    # Fayllar qayta yuklansa - import qilinadi
+    db.query(ImportedFile).delete()
+    bump_data_version(db)
+    db.commit()
+    return deleted_count
@@ -0,0 +1,93 @@
+import re
+from bisect import bisect_left
+
+import numpy as np
+from sqlalchemy import func
+
+from app.database import TradeRecord
+
+# Suggest javobidagi maksimal natijalar soni
+SUGGEST_MAX_LIMIT = 100
+
+# Prefiksdan keyin keladigan har qanday belgidan katta - prefiks oralig'ining oxiri
+PREFIX_END = '\U0010ffff'
+
+# Nom -> so'zlar (harf/raqam ketma-ketliklari)
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text) -> list:
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(str(text).casefold())
+
+
+class ProductIndex:
+    """Mahsulot nomi so'zlari va HS-10 kodlari bo'yicha tartiblangan prefiks indeks"""
+
+    def __init__(self):
+        # (mahsulot nomi, hs_10, hs_6, qatorlar soni) - soni bo'yicha kamayish tartibida
+        self.products = []
+        # Tartiblangan kalitlar va ularga mos mahsulot indekslari (bir xil tartibda)
+        self.keys = []
+        self.ids = np.empty(0, dtype=np.int32)
+
+    @classmethod
+    def build(cls, db) -> "ProductIndex":
+        """Bitta GROUP BY (nom, HS-10) - eng ko'p qatorli mahsulotlar birinchi"""
+        index = cls()
+        rows = db.query(
+            TradeRecord.product_name,
+            TradeRecord.hs_10_code,
+            func.min(TradeRecord.hs_6_code),
+            func.count(TradeRecord.id)
+        ).filter(TradeRecord.product_name.isnot(None))\
+         .group_by(TradeRecord.product_name, TradeRecord.hs_10_code)\
+         .all()
+
+        products = [row for row in rows if row[0] and row[0].strip()]
+        products.sort(key=lambda row: (-row[3], row[0]))
+        index.products = [tuple(row) for row in products]
+
+        keys = set()
+        for i, (name, hs_10, _, _) in enumerate(index.products):
+            for token in tokenize(name):
+                keys.add((token, i))
+            if hs_10:
+                keys.add((str(hs_10).casefold(), i))
+        pairs = sorted(keys)
+        index.keys = [key for key, _ in pairs]
+        index.ids = np.array([i for _, i in pairs], dtype=np.int32)
+        return index
+
+    def _prefix_matches(self, prefix: str) -> np.ndarray:
+        """prefix bilan boshlanadigan kalitlarga tegishli mahsulot indekslari (o'sish tartibida)"""
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + PREFIX_END, start)
+        # Qisqa prefiks minglab kalitga mos kelishi mumkin - Python sikli o'rniga numpy
+        return np.unique(self.ids[start:end])
+
+    def suggest(self, query: str, limit: int = 20) -> list:
+        """Har bir so'rov so'zi biror kalitning prefiksi bo'lgan mahsulotlar (mashhurlari birinchi)"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        # Eng uzun so'z odatda eng kam moslik beradi - undan boshlaymiz
+        tokens.sort(key=len, reverse=True)
+        matches = self._prefix_matches(tokens[0])
+        for token in tokens[1:]:
+            if not len(matches):
+                break
+            matches = np.intersect1d(matches, self._prefix_matches(token), assume_unique=True)
+
+        return [
+            {
+                "name": name,
+                "product_name": name,
+                "hs_10_code": hs_10,
+                "hs_6_code": hs_6,
+                "count": count
+            }
+            for name, hs_10, hs_6, count in (self.products[i] for i in matches[:limit])
+        ]
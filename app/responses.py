@@ -0,0 +1,58 @@
+from fastapi import HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response
+
+# MessagePack ixtiyoriy - o'rnatilmagan bo'lsa doim JSON qaytariladi
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Javob shakllari: rows - har qator obyekt, columnar - umumiy sarlavha va har ustun uchun massiv
+LAYOUTS = ("rows", "columnar")
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+class MsgPackResponse(Response):
+    media_type = "application/msgpack"
+
+    def render(self, content) -> bytes:
+        return msgpack.packb(content, use_bin_type=True)
+
+
+def check_layout(layout: str) -> str:
+    if layout not in LAYOUTS:
+        raise HTTPException(status_code=400, detail=f"layout: {', '.join(LAYOUTS)}")
+    return layout
+
+
+def dictionary_encode(values) -> dict:
+    """Takrorlanadigan matnlar: noyob qiymatlar va har qator uchun indeks (Arrow dictionary kabi)"""
+    index = {}
+    indices = [index.setdefault(value, len(index)) for value in values]
+    return {"dictionary": list(index), "indices": indices}
+
+
+def shape_rows(fields: tuple, rows: list, layout: str, dictionary_fields: tuple = ()):
+    """Tuple qatorlarni tanlangan shaklga keltirish"""
+    if layout == "columnar":
+        columns = [list(column) for column in zip(*rows)] if rows else [[] for _ in fields]
+        columns = [
+            dictionary_encode(column) if field in dictionary_fields else column
+            for field, column in zip(fields, columns)
+        ]
+        return {"fields": list(fields), "columns": columns}
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def wants_msgpack(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return msgpack is not None and any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+
+def data_response(request: Request, content: dict) -> Response:
+    """Accept bo'yicha MessagePack yoki orjson bilan JSON (shu thread da kodlanadi)"""
+    headers = {"Vary": "Accept"}
+    if wants_msgpack(request):
+        return MsgPackResponse(content, headers=headers)
+    return ORJSONResponse(content, headers=headers)
@@ -0,0 +1,285 @@
+import logging
+import threading
+
+import pandas as pd
+from sqlalchemy import text, func, select
+
+from app.database import (
+    get_engine, get_writer_engine, get_db_type, get_state, set_state, ROLLUPS_STALE, ROLLUPS_GENERATION,
+    TradeRecord, FACT_MODEL,
+    TradeRollupYear, TradeRollupPartner, TradeRollupYearHS2
+)
+
+logger = logging.getLogger(__name__)
+
+# Rollup jadvali -> guruhlash ustunlari
+ROLLUP_KEYS = {
+    TradeRollupYear.__tablename__: ('year',),
+    TradeRollupPartner.__tablename__: ('trading_partner',),
+    TradeRollupYearHS2.__tablename__: ('year', 'hs_2_code'),
+}
+MEASURES = ('import_volume', 'import_price', 'export_volume', 'export_price')
+
+# NULL kalitlar primary key ga tushmaydi - batch dagi default lar bilan bir xil
+KEY_DEFAULTS = {'year': 0, 'trading_partner': '', 'hs_2_code': ''}
+KEY_SQL_DEFAULTS = {'year': "0", 'trading_partner': "''", 'hs_2_code': "''"}
+
+# Import delta sini aniq hisoblab yoki yozib bo'lmaganda app_state.rollups_stale = 1 -
+# import tugagach (yoki keyingi startda) istalgan process refresh_if_stale() orqali
+# to'liq qayta hisoblaydi
+_lock = threading.Lock()
+
+# Mavjud hash larni tekshirishdagi IN ro'yxati hajmi
+HASH_LOOKUP_CHUNK = 5000
+
+
+def _upsert_sql(table: str, keys: tuple):
+    """Bir rollup qatoriga delta qo'shish (dialektga mos upsert)"""
+    columns = keys + ('record_count',) + MEASURES
+    names = ', '.join(columns)
+    values = ', '.join(f":{c}" for c in columns)
+
+    db_type = get_db_type()
+    if db_type == "mysql":
+        updates = ', '.join(f"{c} = {c} + VALUES({c})" for c in ('record_count',) + MEASURES)
+        return text(f"INSERT INTO {table} ({names}) VALUES ({values}) ON DUPLICATE KEY UPDATE {updates}")
+    if db_type in ("sqlite", "postgresql"):
+        updates = ', '.join(f"{c} = {table}.{c} + excluded.{c}" for c in ('record_count',) + MEASURES)
+        return text(
+            f"INSERT INTO {table} ({names}) VALUES ({values}) "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}"
+        )
+    return None
+
+
+def mark_stale(conn):
+    """Rollup larni keyingi refresh_if_stale() da to'liq qayta hisoblashga belgilash"""
+    set_state(conn, ROLLUPS_STALE, 1)
+
+
+def is_stale() -> bool:
+    try:
+        with get_engine().connect() as conn:
+            return bool(get_state(conn, ROLLUPS_STALE))
+    except Exception as e:
+        # app_state hali yaratilmagan (eski baza) - init_database() gacha belgi yo'q
+        logger.warning(f"⚠️ Rollup holati o'qilmadi: {e}")
+        return False
+
+
+def current_generation():
+    """rebuild()/clear() hisoblagichi (app_state o'qilmasa None)"""
+    try:
+        with get_engine().connect() as conn:
+            return get_state(conn, ROLLUPS_GENERATION)
+    except Exception as e:
+        logger.warning(f"⚠️ Rollup holati o'qilmadi: {e}")
+        return None
+
+
+def existing_hashes(conn, hashes: list) -> set:
+    """hashes dan bazada allaqachon bor bo'lganlari"""
+    existing = set()
+    for start in range(0, len(hashes), HASH_LOOKUP_CHUNK):
+        existing.update(conn.execute(
+            select(FACT_MODEL.row_hash).where(FACT_MODEL.row_hash.in_(hashes[start:start + HASH_LOOKUP_CHUNK]))
+        ).scalars())
+    return existing
+
+
+def _group(frame: pd.DataFrame) -> pd.DataFrame:
+    """Qatorlarni eng mayda rollup kaliti (year, trading_partner, hs_2_code) bo'yicha yig'ish"""
+    frame = frame.assign(record_count=1)
+    for col, default in KEY_DEFAULTS.items():
+        frame[col] = frame[col].fillna(default)
+        if col == 'year':
+            frame[col] = frame[col].astype(int)
+    for col in MEASURES:
+        frame[col] = frame[col].fillna(0)
+    return frame.groupby(list(KEY_DEFAULTS), as_index=False)[['record_count', *MEASURES]].sum()
+
+
+class BatchDelta:
+    """Import batch ining rollup delta si - loader tranzaksiyasi ichida hisoblanadi, lekin yozilmaydi
+
+    Tranzaksiya ichida faqat o'qiladi (mavjud hash lar) - rollup qatorlari qulflanmaydi, parallel
+    writer lar bir-birini kutmaydi. Delta batch commit bo'lgandan keyin ImportDelta ga qo'shiladi.
+    """
+
+    def __init__(self, columns: dict):
+        self.columns = columns
+        self.existing = set()
+        self.grouped = None
+        self.exact = True
+
+    def before_insert(self, conn):
+        # INSERT IGNORE qaysi qatorlarni o'tkazib yuborishi oldindan ma'lum bo'ladi
+        self.existing = existing_hashes(conn, list(set(self.columns['row_hash'])))
+
+    def after_insert(self, conn, inserted: int):
+        """Batch dagi yangi (bazada bo'lmagan) qatorlar yig'indisi"""
+        columns = self.columns
+        frame = pd.DataFrame({
+            col: columns.get(col, [KEY_DEFAULTS.get(col, 0)] * len(columns['row_hash']))
+            for col in ('row_hash', 'year', 'trading_partner', 'hs_2_code') + MEASURES
+        })
+        # Batch ichidagi bir xil qatorlar bir marta, bazada bor qatorlar umuman yozilmaydi
+        frame = frame.drop_duplicates('row_hash')
+        frame = frame[~frame['row_hash'].isin(self.existing)]
+        self.exact = inserted == len(frame)
+        if not self.exact:
+            # Tekshiruv va yozish orasida boshqa yozuvchi - qaysi qator yozilgani noma'lum
+            logger.warning(f"⚠️ Rollup delta aniq emas ({inserted} != {len(frame)}), qayta hisoblanadi")
+        self.grouped = _group(frame) if self.exact and inserted else None
+
+
+class ImportDelta:
+    """Bitta import ning commit bo'lgan batch delta lari - import oxirida bitta qisqa tranzaksiyada yoziladi
+
+    Hot rollup qatorlari har batch da emas, bir marta yangilanadi (MySQL da writer lar row lock
+    da navbatga turmaydi). Import boshlangandan keyin rebuild()/clear() bo'lgan bo'lsa (generation
+    o'zgargan) delta yozilmaydi - rollups_stale belgilanadi, aks holda qatorlar ikki marta hisoblanardi.
+    """
+
+    def __init__(self):
+        # Birinchi batch commit bo'lishidan oldin o'qiladi
+        self.generation = current_generation()
+        self.totals = None
+        self.exact = True
+        self._lock = threading.Lock()
+
+    def add(self, delta: BatchDelta):
+        """Batch commit bo'lgandan keyin"""
+        with self._lock:
+            if not delta.exact:
+                self.exact = False
+            if delta.grouped is None:
+                return
+            if self.totals is not None:
+                combined = pd.concat([self.totals, delta.grouped], ignore_index=True)
+                self.totals = combined.groupby(list(KEY_DEFAULTS), as_index=False)[['record_count', *MEASURES]].sum()
+            else:
+                self.totals = delta.grouped
+
+    def apply(self):
+        """Yig'ilgan delta ni rollup larga yozish; xatolikda - rollups_stale"""
+        if self.totals is None and self.exact:
+            return
+        try:
+            with _lock, get_writer_engine().begin() as conn:
+                # rebuild() generation ni tranzaksiyasi boshida oshiradi - FOR UPDATE u bilan navbatlashadi
+                generation = get_state(conn, ROLLUPS_GENERATION, for_update=True)
+                if not self.exact or self.generation is None or generation != self.generation:
+                    mark_stale(conn)
+                elif self.totals is not None:
+                    _apply_deltas(conn, self.totals, sign=1)
+        except Exception as e:
+            logger.warning(f"⚠️ Rollup delta yozilmadi, qayta hisoblanadi: {e}")
+            try:
+                with get_writer_engine().begin() as conn:
+                    mark_stale(conn)
+            except Exception as e:
+                logger.error(f"❌ Rollup holati yozilmadi: {e}")
+
+
+def remove_rows(conn, rows: list):
+    """O'chiriladigan qatorlarni (year, trading_partner, hs_2_code, *MEASURES) rollup lardan ayirish
+
+    Qatorlarni o'chirish bilan bitta tranzaksiyada chaqiriladi; bo'shab qolgan guruhlar o'chiriladi.
+    """
+    if not rows:
+        return
+    frame = pd.DataFrame(rows, columns=('year', 'trading_partner', 'hs_2_code') + MEASURES)
+    if _apply_deltas(conn, _group(frame), sign=-1):
+        for table in ROLLUP_KEYS:
+            conn.execute(text(f"DELETE FROM {table} WHERE record_count <= 0"))
+
+
+def _apply_deltas(conn, grouped: pd.DataFrame, sign: int) -> bool:
+    """_group() natijasini (sign=-1 - ayirish) rollup jadvallariga upsert qilish"""
+    statements = {table: _upsert_sql(table, keys) for table, keys in ROLLUP_KEYS.items()}
+    if any(sql is None for sql in statements.values()):
+        mark_stale(conn)
+        return False
+
+    for table, keys in ROLLUP_KEYS.items():
+        deltas = grouped.groupby(list(keys), as_index=False)[['record_count', *MEASURES]].sum()
+        deltas[['record_count', *MEASURES]] *= sign
+        conn.execute(statements[table], deltas.to_dict('records'))
+    return True
+
+
+def rebuild(conn=None):
+    """Rollup jadvallarini trade_records dan to'liq qayta hisoblash"""
+    if conn is None:
+        with _lock, get_engine().begin() as conn:
+            return rebuild(conn)
+
+    # Boshida - import oxiridagi ImportDelta.apply() bilan shu qator orqali navbatlashadi
+    _next_generation(conn)
+    for table, keys in ROLLUP_KEYS.items():
+        key_exprs = ', '.join(f"COALESCE({k}, {KEY_SQL_DEFAULTS[k]})" for k in keys)
+        sums = ', '.join(f"COALESCE(SUM({m}), 0)" for m in MEASURES)
+        conn.execute(text(f"DELETE FROM {table}"))
+        conn.execute(text(
+            f"INSERT INTO {table} ({', '.join(keys)}, record_count, {', '.join(MEASURES)}) "
+            f"SELECT {key_exprs}, COUNT(*), {sums} FROM {TradeRecord.__tablename__} "
+            f"GROUP BY {key_exprs}"
+        ))
+    set_state(conn, ROLLUPS_STALE, 0)
+    logger.info("📊 Rollup jadvallari qayta hisoblandi")
+
+
+def clear(conn):
+    """Barcha ma'lumot o'chirilganda rollup larni bo'shatish"""
+    _next_generation(conn)
+    for table in ROLLUP_KEYS:
+        conn.execute(text(f"DELETE FROM {table}"))
+    set_state(conn, ROLLUPS_STALE, 0)
+
+
+def _next_generation(conn):
+    set_state(conn, ROLLUPS_GENERATION, get_state(conn, ROLLUPS_GENERATION, for_update=True) + 1)
+
+
+def refresh_if_stale():
+    """Import tugagach: delta aniq bo'lmagan bo'lsa to'liq qayta hisoblash"""
+    if is_stale():
+        rebuild()
+
+
+def ensure_rollups():
+    """Ilova ishga tushganda: rollup lar bo'sh (ma'lumot bor) yoki stale bo'lsa - qayta hisoblash"""
+    try:
+        with get_engine().connect() as conn:
+            has_rollups = conn.execute(text(f"SELECT 1 FROM {TradeRollupYear.__tablename__} LIMIT 1")).first()
+            has_records = conn.execute(text(f"SELECT 1 FROM {TradeRecord.__tablename__} LIMIT 1")).first()
+            stale = get_state(conn, ROLLUPS_STALE)
+        if (has_records and not has_rollups) or stale:
+            rebuild()
+    except Exception as e:
+        logger.warning(f"⚠️ Rollup jadvallari tayyorlanmadi: {e}")
+
+
+def read_stats(db, top_countries: int = 10) -> dict:
+    """/stats uchun natija - faqat rollup jadvallaridan"""
+    totals = db.query(
+        func.coalesce(func.sum(TradeRollupYear.record_count), 0),
+        func.coalesce(func.sum(TradeRollupYear.import_price), 0),
+        func.coalesce(func.sum(TradeRollupYear.export_price), 0)
+    ).one()
+
+    year_stats = db.query(TradeRollupYear.year, TradeRollupYear.record_count)\
+                   .order_by(TradeRollupYear.year).all()
+
+    country_stats = db.query(TradeRollupPartner.trading_partner, TradeRollupPartner.record_count)\
+                      .order_by(TradeRollupPartner.record_count.desc())\
+                      .limit(top_countries).all()
+
+    return {
+        "total_records": int(totals[0]),
+        "total_import_value": float(totals[1]),
+        "total_export_value": float(totals[2]),
+        "year_stats": [{"year": year, "count": count} for year, count in year_stats],
+        "country_stats": [{"country": country, "count": count} for country, count in country_stats]
+    }
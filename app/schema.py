@@ -0,0 +1,21 @@
+import logging
+
+from app.database import env_bool, init_schema
+from app.text_search import ensure_search_index
+from app import rollups
+
+logger = logging.getLogger(__name__)
+
+# Ilova startida sxemani tekshirish/yaratish - standart o'chiq: serverless (vercel) da har
+# sovuq startda MySQL probe, create_all, FTS va rollup tekshiruvi bajarilmasligi uchun.
+# Sxema deploy paytida `python init_db.py` bilan yaratiladi; run.py (lokal) uni yoqadi.
+DB_AUTO_INIT = env_bool("DB_AUTO_INIT", False)
+
+
+def init_database():
+    """Jadvallar, matn qidiruv indeksi va rollup lar - hammasi idempotent"""
+    init_schema()
+    # product_name / trading_partner qidiruvi uchun FTS5 (SQLite) yoki FULLTEXT (MySQL)
+    ensure_search_index()
+    rollups.ensure_rollups()
+    logger.info("✅ Database sxemasi tayyor")
@@ -0,0 +1,209 @@
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import func, distinct, select, true
+
+from app.database import (
+    ReadSessionLocal, TradeRecord, TradeFact, DimPartner, DimProduct, star_schema,
+    DATA_VERSION, get_state, env_int
+)
+from app.hs_tree import HSTree
+from app.product_search import ProductIndex
+
+logger = logging.getLogger(__name__)
+
+# Filtr oynasida ko'rsatiladigan mahsulotlar soni (tezlik uchun)
+FILTER_PRODUCTS_LIMIT = 1000
+
+# Boshqa process (worker) ma'lumotni o'zgartirganini app_state.data_version dan
+# tekshirish oralig'i (soniya) - har so'rovda emas, bitta qisqa PK so'rovi
+SNAPSHOT_CHECK_INTERVAL = env_int("SNAPSHOT_CHECK_INTERVAL", 2)
+
+
+def build_filter_options(db) -> dict:
+    """Dashboard filtrlari uchun davlatlar, mahsulotlar va yillar"""
+    if star_schema:
+        # Star rejim: faktlarda uchraydigan lug'at id lari, matnlar kichik lug'at jadvallaridan
+        partner, product = DimPartner, DimProduct
+        partner_name, product_name = DimPartner.name, DimProduct.product_name
+        partner_used = DimPartner.id.in_(select(TradeFact.partner_id).distinct())
+        product_used = DimProduct.id.in_(select(TradeFact.product_id).distinct())
+        year_column = TradeFact.year
+    else:
+        partner = product = TradeRecord
+        partner_name, product_name = TradeRecord.trading_partner, TradeRecord.product_name
+        partner_used = product_used = true()
+        year_column = TradeRecord.year
+
+    # Countries
+    countries_raw = db.query(distinct(partner_name))\
+                 .filter(partner_name.isnot(None), partner_used)\
+                 .order_by(partner_name)\
+                 .all()
+
+    countries = [c[0] for c in countries_raw if c[0] and c[0].strip()]
+
+    # Products - JAMI sonini hisoblash
+    total_products_count = db.query(func.count(distinct(product_name)))\
+                         .filter(product_name.isnot(None), product_used).scalar()
+
+    # Faqat birinchi FILTER_PRODUCTS_LIMIT ta mahsulotni olish
+    products_raw = db.query(
+        product_name,
+        product.hs_10_code,
+        product.hs_6_code
+    ).filter(product_name.isnot(None), product_used)\
+     .distinct()\
+     .limit(FILTER_PRODUCTS_LIMIT)\
+     .all()
+
+    products = []
+    for p in products_raw:
+        if p[0] and p[0].strip():
+            products.append({
+                "name": p[0],
+                "product_name": p[0],
+                "hs_10_code": p[1],
+                "hs_6_code": p[2]
+            })
+
+    # Years
+    years_raw = db.query(distinct(year_column))\
+             .filter(year_column > 1990)\
+             .order_by(year_column.desc())\
+             .all()
+
+    years = [y[0] for y in years_raw if y[0]]
+
+    return {
+        "success": True,
+        "countries": countries,
+        "products": products,
+        "years": years,
+        "pagination": {
+            "total": total_products_count,  # Jami mahsulotlar soni
+            "loaded": len(products),        # Yuklangan mahsulotlar soni
+            "has_more": len(products) < total_products_count
+        }
+    }
+
+
+class DataSnapshots:
+    """Ma'lumot o'zgarganda (import, dedupe, clear) qayta quriladigan xotiradagi natijalar"""
+
+    def __init__(self):
+        # Ma'lumot versiyasi - app_state.data_version (barcha process larda bir xil),
+        # u bo'lmasa millisekund vaqt belgisi
+        self.version = 0
+        # Snapshot qaysi data_version dan qurilgan (None - app_state o'qilmagan)
+        self.source_version = None
+        self.checked_at = 0.0
+        self.built_at = None
+        self.filter_options = None
+        # (versiya, filter_options ning tayyor JSON i) - har so'rovda qayta serializatsiya qilinmaydi
+        self.filter_options_json = (0, b"")
+        self.hs_tree = None
+        self.product_index = None
+        self._lock = threading.Lock()
+
+    def _next_version(self) -> int:
+        return max(self.version + 1, int(time.time() * 1000))
+
+    @property
+    def ready(self) -> bool:
+        return self.filter_options is not None
+
+    @property
+    def check_due(self) -> bool:
+        """Boshqa process lar yozgan versiyani tekshirish vaqti keldimi"""
+        return time.monotonic() - self.checked_at >= SNAPSHOT_CHECK_INTERVAL
+
+    def read_data_version(self):
+        """app_state dagi joriy versiya (jadval yo'q yoki xatolik - None)"""
+        db = ReadSessionLocal()
+        try:
+            return get_state(db, DATA_VERSION)
+        except Exception as e:
+            logger.warning(f"⚠️ Ma'lumot versiyasi o'qilmadi: {e}")
+            return None
+        finally:
+            db.close()
+
+    def ensure(self):
+        """Snapshot qurilmagan yoki boshqa process ma'lumotni o'zgartirgan bo'lsa qurish
+
+        Parallel so'rovlar bir marta quradi.
+        """
+        if not self.ready:
+            with self._lock:
+                if not self.ready:
+                    self._build()
+            return
+
+        if not self.check_due:
+            return
+        self.checked_at = time.monotonic()
+        version = self.read_data_version()
+        if version is not None and version != self.source_version:
+            with self._lock:
+                if version != self.source_version:
+                    self._build()
+
+    def get_filter_options(self) -> dict:
+        """Tayyor snapshot (birinchi so'rovda quriladi)"""
+        self.ensure()
+        return self.filter_options
+
+    def get_hs_tree(self) -> HSTree:
+        self.ensure()
+        return self.hs_tree
+
+    def get_product_index(self) -> ProductIndex:
+        self.ensure()
+        return self.product_index
+
+    def rebuild(self):
+        """Ma'lumot o'zgargandan keyin chaqiriladi - yangi versiya bilan qayta qurish"""
+        with self._lock:
+            self._build()
+
+    def _build(self):
+        start = time.time()
+        # Versiya ma'lumotdan oldin o'qiladi - qurish paytidagi o'zgarish keyingi tekshiruvda ko'rinadi
+        source_version = self.read_data_version()
+        db = ReadSessionLocal()
+        try:
+            filter_options = build_filter_options(db)
+            hs_tree = HSTree.build(db)
+            product_index = ProductIndex.build(db)
+        finally:
+            db.close()
+
+        version = source_version or self._next_version()
+        filter_options["data_version"] = version
+        filter_options_body = json.dumps(
+            filter_options, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        # Tayyor bo'lgach bitta havola almashtiriladi - o'quvchilar kutmaydi
+        self.filter_options_json = (version, filter_options_body)
+        self.hs_tree = hs_tree
+        self.product_index = product_index
+        self.version = version
+        self.source_version = source_version
+        self.checked_at = time.monotonic()
+        self.built_at = datetime.utcnow()
+        # ready oxirida - hamma qismlar tayyor bo'lgandan keyin
+        self.filter_options = filter_options
+        logger.info(f"📸 Snapshot qayta qurildi: versiya {version}, {time.time() - start:.2f} soniya")
+
+    def info(self) -> dict:
+        return {
+            "data_version": self.version,
+            "built_at": self.built_at.isoformat() + "Z" if self.built_at else None
+        }
+
+
+snapshots = DataSnapshots()
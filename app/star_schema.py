@@ -0,0 +1,220 @@
+import hashlib
+import logging
+import threading
+
+from sqlalchemy import insert, select, func, literal_column
+
+from app.database import (
+    get_engine, get_writer_engine, star_schema, TradeRecord, TradeFact, DimPartner, DimMeasure, DimProduct
+)
+
+logger = logging.getLogger(__name__)
+
+# Fakt jadvaliga to'g'ridan-to'g'ri o'tadigan ustunlar
+FACT_VALUE_COLUMNS = (
+    'year', 'export_volume', 'export_price', 'import_volume', 'import_price',
+    'created_at', 'row_hash'
+)
+
+# Bir SELECT ... IN (...) dagi kalitlar soni
+LOOKUP_CHUNK_SIZE = 500
+
+
+class DimensionCache:
+    """Lug'at jadvali uchun xotiradagi kalit -> id keshi (yo'qlari batch bilan yoziladi)"""
+
+    def __init__(self, model, columns: dict):
+        self.model = model
+        # lug'at ustuni -> trade_records (batch) ustuni
+        self.columns = columns
+        self.ids = {}
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_hash(key: tuple) -> str:
+        return hashlib.md5('\x1f'.join(key).encode('utf-8')).hexdigest()
+
+    def keys_from_batch(self, batch: dict, length: int) -> list:
+        """Batch ustunlaridan tabiiy kalitlar (matn sifatida, NULL -> '')"""
+        values = [batch.get(col, [''] * length) for col in self.columns.values()]
+        return [
+            tuple('' if v is None else str(v) for v in row)
+            for row in zip(*values)
+        ]
+
+    def resolve(self, keys: list) -> list:
+        """Kalitlar ro'yxati uchun surrogate id lar (kerak bo'lsa lug'atga qo'shib)"""
+        missing = {key for key in keys if key not in self.ids}
+        if missing:
+            with self._lock:
+                if not self.loaded:
+                    self._load_all()
+                missing = {key for key in missing if key not in self.ids}
+                if missing:
+                    self._insert(missing)
+        return [self.ids[key] for key in keys]
+
+    def _load_all(self):
+        """Birinchi murojaatda butun lug'atni keshga olish (lug'atlar kichik)"""
+        columns = [getattr(self.model, col) for col in self.columns]
+        with get_engine().connect() as conn:
+            for row in conn.execute(select(self.model.id, *columns)):
+                self.ids[tuple('' if v is None else v for v in row[1:])] = row[0]
+        self.loaded = True
+
+    def _insert(self, keys: set):
+        """Yangi kalitlarni INSERT IGNORE bilan yozib, id larini o'qish (parallel writer larga xavfsiz)"""
+        by_hash = {self.key_hash(key): key for key in keys}
+        rows = [
+            {"key_hash": h, **dict(zip(self.columns, key))}
+            for h, key in by_hash.items()
+        ]
+        statement = insert(self.model)\
+            .prefix_with("OR IGNORE", dialect="sqlite")\
+            .prefix_with("IGNORE", dialect="mysql")
+
+        hashes = list(by_hash)
+        with get_writer_engine().begin() as conn:
+            conn.execute(statement, rows)
+            for start in range(0, len(hashes), LOOKUP_CHUNK_SIZE):
+                chunk = hashes[start:start + LOOKUP_CHUNK_SIZE]
+                found = conn.execute(
+                    select(self.model.key_hash, self.model.id).where(self.model.key_hash.in_(chunk))
+                )
+                for h, dim_id in found:
+                    self.ids[by_hash[h]] = dim_id
+
+        logger.info(f"📚 {self.model.__tablename__}: {len(keys)} ta yangi kalit")
+
+    def clear(self):
+        with self._lock:
+            self.ids = {}
+            self.loaded = False
+
+
+class StarSchemaResolver:
+    """ExcelProcessor batch ini (matn ustunlari) fakt jadvali ustunlariga aylantirish"""
+
+    def __init__(self):
+        self.dimensions = {
+            'partner_id': DimensionCache(DimPartner, {'name': 'trading_partner'}),
+            'measure_id': DimensionCache(DimMeasure, {'name': 'measure'}),
+            'product_id': DimensionCache(DimProduct, {
+                'hs_2_code': 'hs_2_code',
+                'hs_4_code': 'hs_4_code',
+                'hs_6_code': 'hs_6_code',
+                'hs_10_code': 'hs_10_code',
+                'product_name': 'product_name',
+                'hs_group': 'hs_group',
+            }),
+        }
+
+    def to_fact_columns(self, batch: dict) -> dict:
+        length = len(batch['row_hash'])
+        facts = {}
+        for fact_column, cache in self.dimensions.items():
+            facts[fact_column] = cache.resolve(cache.keys_from_batch(batch, length))
+        for col in FACT_VALUE_COLUMNS:
+            if col in batch:
+                facts[col] = batch[col]
+        return facts
+
+    def clear(self):
+        for cache in self.dimensions.values():
+            cache.clear()
+
+
+# Barcha ExcelProcessor lar uchun bitta kesh
+star_resolver = StarSchemaResolver()
+
+
+# O'qish: nomlar avval lug'at id lariga aylantiriladi, fakt qatorlari integer kalitlar bo'yicha
+# filtrlanadi va guruhlanadi - lug'at faqat natijani nomlash uchun qo'shiladi.
+# trade_records VIEW dagi fakt kalitlari (qatorlar VIEW dan o'qilganda)
+VIEW_KEYS = {
+    'partner': literal_column(f"{TradeRecord.__tablename__}.partner_id"),
+    'product': literal_column(f"{TradeRecord.__tablename__}.product_id"),
+}
+FACT_KEYS = {
+    'partner': TradeFact.partner_id,
+    'product': TradeFact.product_id,
+}
+
+# /api/aggregate o'lchovlari: (lug'at jadvali, ustun); None - fakt jadvali ustuni
+STAR_DIMENSIONS = {
+    "year": (None, 'year'),
+    "partner": (DimPartner, 'name'),
+    "product": (DimProduct, 'product_name'),
+    "hs_2": (DimProduct, 'hs_2_code'),
+    "hs_4": (DimProduct, 'hs_4_code'),
+    "hs_6": (DimProduct, 'hs_6_code'),
+    "hs_group": (DimProduct, 'hs_group'),
+}
+DIMENSION_KEYS = {DimPartner: 'partner', DimProduct: 'product'}
+
+
+def dimension_ids(db, column, names: list) -> list:
+    """Lug'atdagi nomlar -> id lar (nom ustuni indeksli)"""
+    return list(db.execute(select(column.class_.id).where(column.in_(names))).scalars())
+
+
+def name_filters(db, countries: list, products: list, keys: dict = None) -> list:
+    """Davlat / mahsulot nomlari bo'yicha IN filtrlari
+
+    Flat - matn ustunlari; star - nomlar oldindan id larga, keys (standart - VIEW kalitlari) integer
+    taqqoslanadi.
+    """
+    conditions = []
+    if not star_schema:
+        if countries:
+            conditions.append(TradeRecord.trading_partner.in_(countries))
+        if products:
+            conditions.append(TradeRecord.product_name.in_(products))
+        return conditions
+
+    keys = keys or VIEW_KEYS
+    if countries:
+        conditions.append(keys['partner'].in_(dimension_ids(db, DimPartner.name, countries)))
+    if products:
+        conditions.append(keys['product'].in_(dimension_ids(db, DimProduct.product_name, products)))
+    return conditions
+
+
+def aggregate_facts(db, group_by: list, measures: list, countries: list, products: list, years: list):
+    """Star rejim /api/aggregate so'rovi
+
+    Fakt qatorlari ichki so'rovda (year, partner_id, product_id) bo'yicha yig'iladi; lug'at
+    ustunlari kichik natijaga qo'shilib, so'ralgan o'lchovlar bo'yicha qayta guruhlanadi.
+    """
+    models = [model for model in (DimPartner, DimProduct)
+              if any(STAR_DIMENSIONS[g][0] is model for g in group_by)]
+    keys = [TradeFact.year] if "year" in group_by else []
+    keys += [FACT_KEYS[DIMENSION_KEYS[model]] for model in models]
+
+    conditions = name_filters(db, countries, products, FACT_KEYS)
+    if years:
+        conditions.append(TradeFact.year.in_(years))
+    facts = select(
+        *keys,
+        func.count(TradeFact.id).label('record_count'),
+        *[func.sum(getattr(TradeFact, m)).label(m) for m in measures]
+    ).where(*conditions)
+    if keys:
+        facts = facts.group_by(*keys)
+    facts = facts.subquery()
+
+    dimensions = [
+        facts.c.year if model is None else getattr(model, column)
+        for model, column in (STAR_DIMENSIONS[g] for g in group_by)
+    ]
+    query = select(
+        *dimensions,
+        func.coalesce(func.sum(facts.c.record_count), 0),
+        *[func.coalesce(func.sum(facts.c[m]), 0) for m in measures]
+    ).select_from(facts)
+    for model in models:
+        query = query.outerjoin(model, model.id == facts.c[FACT_KEYS[DIMENSION_KEYS[model]].key])
+    if dimensions:
+        query = query.group_by(*dimensions).order_by(*dimensions)
+    return query
@@ -69,8 +69,8 @@ function setupFileUpload() {
         fileInfo.style.display = 'block';
 
         // Validation
-        if (!file.name.endsWith('.xlsx') && !file.name.endsWith('.xls')) {
-            showResult('Faqat Excel fayl (.xlsx, .xls) yuklash mumkin!', 'error');
+        if (!/\.(xlsx|xls|csv|parquet|zip)$/i.test(file.name)) {
+            showResult('Faqat .xlsx, .xls, .csv, .parquet yoki .zip fayl yuklash mumkin!', 'error');
             return;
         }
 
@@ -98,16 +98,24 @@ function setupFileUpload() {
             const data = await response.json();
 
             if (data.success) {
-                showResult(data.message, 'success');
-                loadStats(); // Refresh stats
+                // Import fonda - progressni kuzatish
+                watchImportJob(data, progressFill, (job) => {
+                    progress.style.display = 'none';
+                    if (job.status === 'completed') {
+                        showResult(job.result.message, 'success');
+                        loadStats(); // Refresh stats
+                    } else {
+                        showResult(`Xatolik: ${job.error}`, 'error');
+                    }
+                });
             } else {
+                progress.style.display = 'none';
                 showResult(`Xatolik: ${data.error}`, 'error');
             }
 
         } catch (error) {
-            showResult(`Tarmoq xatoligi: ${error.message}`, 'error');
-        } finally {
             progress.style.display = 'none';
+            showResult(`Tarmoq xatoligi: ${error.message}`, 'error');
         }
     }
 
@@ -118,6 +126,74 @@ function setupFileUpload() {
     }
 }
 
+// Import vazifasi progressini kuzatish (SSE, bo'lmasa polling)
+function watchImportJob(upload, progressFill, onDone) {
+    const progressText = document.getElementById('progressText');
+
+    function render(job) {
+        const stages = {
+            queued: 'Navbatda...',
+            reading: 'O\'qilmoqda...',
+            cleaning: 'Tozalanmoqda...',
+            inserting: 'Yozilmoqda...',
+            done: 'Yakunlanmoqda...'
+        };
+        if (job.progress !== null) {
+            progressFill.style.width = `${job.progress}%`;
+        }
+        let text = `${stages[job.stage] || job.stage} ${job.rows_inserted.toLocaleString()} ta yozildi`;
+        if (job.total_rows) {
+            text += ` / ${job.total_rows.toLocaleString()}`;
+        }
+        if (job.eta_seconds !== null) {
+            text += ` (~${Math.ceil(job.eta_seconds)} s qoldi)`;
+        }
+        if (progressText) {
+            progressText.textContent = text;
+        }
+    }
+
+    function finish(job) {
+        render(job);
+        onDone(job);
+    }
+
+    if (window.EventSource) {
+        const source = new EventSource(upload.events_url);
+        source.onmessage = (event) => {
+            const job = JSON.parse(event.data);
+            if (job.status === 'completed' || job.status === 'failed') {
+                source.close();
+                finish(job);
+            } else {
+                render(job);
+            }
+        };
+        source.onerror = () => {
+            // Ulanish uzilsa - polling ga o'tish
+            source.close();
+            pollImportJob(upload.status_url, render, finish);
+        };
+    } else {
+        pollImportJob(upload.status_url, render, finish);
+    }
+}
+
+async function pollImportJob(statusUrl, render, finish) {
+    try {
+        const response = await fetch(statusUrl);
+        const job = await response.json();
+        if (job.status === 'completed' || job.status === 'failed') {
+            finish(job);
+            return;
+        }
+        render(job);
+    } catch (error) {
+        console.error('Import holatini olishda xatolik:', error);
+    }
+    setTimeout(() => pollImportJob(statusUrl, render, finish), 1000);
+}
+
 // Load statistics
 async function loadStats() {
     try {
@@ -0,0 +1,202 @@
+import logging
+
+from sqlalchemy import text, inspect, and_, select, func, literal_column, column as sql_column, String
+
+from app.database import get_engine, get_writer_engine, get_db_type, star_schema, TradeRecord, DimPartner, DimProduct
+
+logger = logging.getLogger(__name__)
+
+# Qidiriladigan matn ustunlari
+SEARCH_COLUMNS = ('product_name', 'trading_partner')
+
+# SQLite: ustunlardagi noyob qiymatlar (trade_records emas) va ularning FTS5 indeksi
+TERMS_TABLE = "trade_search_terms"
+FTS_TABLE = "trade_search_terms_fts"
+# Oldingi sxema: har qatorga trigger li FTS - yuklashni ~4x sekinlashtirgani uchun olib tashlanadi
+LEGACY_FTS_TABLE = "trade_records_fts"
+
+# Indeks ishlatiladigan eng qisqa qidiruv so'zi (trigram - 3, MySQL ngram - 2)
+MIN_TERM_LENGTH = {"fts5": 3, "fulltext": 2}
+
+# Star rejim: matn lug'at jadvalida qidiriladi (trade_records VIEW dagi ..._id ustuni bo'yicha)
+DIMENSION_SEARCH = {
+    'trading_partner': ('partner_id', DimPartner.name),
+    'product_name': ('product_id', DimProduct.product_name),
+}
+
+# Aniqlangan qidiruv usuli: "fts5" (SQLite), "fulltext" (MySQL),
+# "dimension" (star rejim) yoki None (oddiy LIKE)
+search_backend = None
+_backend_checked = False
+
+
+def ensure_search_index(create: bool = True):
+    """Matn qidiruv indeksini yaratish (bir marta) va usulni aniqlash; create=False - faqat mavjudini tekshirish"""
+    global search_backend, _backend_checked
+    try:
+        db_type = get_db_type()
+        if star_schema:
+            # Lug'atlar kichik - indeks kerak emas
+            backend = "dimension"
+        elif db_type == "sqlite":
+            backend = "fts5" if _ensure_fts5(create) else None
+        elif db_type == "mysql":
+            backend = "fulltext" if _ensure_fulltext(create) else None
+        else:
+            backend = None
+    except Exception as e:
+        backend = None
+        logger.warning(f"⚠️ Matn qidiruv indeksi yaratilmadi, LIKE ishlatiladi: {e}")
+    search_backend = backend
+    _backend_checked = True
+    return search_backend
+
+
+def get_search_backend():
+    """Qidiruv usuli - sxema ilova startida yaratilmagan bo'lsa birinchi so'rovda aniqlanadi"""
+    if not _backend_checked:
+        ensure_search_index(create=False)
+    return search_backend
+
+
+def _ensure_fts5(create: bool = True) -> bool:
+    """SQLite: qidiruv ustunlarining noyob qiymatlari uchun FTS5 (trigram) indeksi
+
+    trade_records da trigger yo'q - har qatorga trigram yozish yuklashni ~4x sekinlashtirardi va
+    DELETE ning truncate optimizatsiyasini o'chirardi. Indeks faqat noyob qiymatlarni saqlaydi
+    (davlatlar, mahsulot nomlari - qatorlardan ancha kam). Yozish narxi: har batch commit dan keyin
+    batch dagi yangi qiymatlar bitta qisqa tranzaksiyada qo'shiladi (index_batch_terms), qidiruv
+    topilgan qiymatlar bo'yicha ustun indeksidan qatorlarni oladi.
+    """
+    table = TradeRecord.__tablename__
+    with get_engine().begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE}
+        ).first()
+        if not create:
+            return bool(exists)
+        if exists:
+            # Indeksga tushmay qolgan qiymatlar (masalan, tashqaridan yozilgan qatorlar)
+            sync_search_terms(conn)
+            return True
+
+        for suffix in ("ai", "ad", "au"):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {LEGACY_FTS_TABLE}_{suffix}"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {LEGACY_FTS_TABLE}"))
+
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {TERMS_TABLE} ("
+            "id INTEGER PRIMARY KEY, field TEXT NOT NULL, value TEXT NOT NULL, UNIQUE (field, value))"
+        ))
+        # content= - matnning o'zi terms jadvalida, FTS faqat indeksni saqlaydi
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"field UNINDEXED, value, content='{TERMS_TABLE}', content_rowid='id', tokenize='trigram')"
+        ))
+        # Faqat yangi noyob qiymat qo'shilganda ishlaydi (INSERT OR IGNORE - mavjudlari uchun emas)
+        conn.execute(text(
+            f"CREATE TRIGGER {TERMS_TABLE}_ai AFTER INSERT ON {TERMS_TABLE} BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, field, value) VALUES (new.id, new.field, new.value); END"
+        ))
+        # Topilgan qiymatlar bo'yicha qatorlarni olish uchun
+        for column in SEARCH_COLUMNS:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_{column} ON {table} ({column})"))
+        sync_search_terms(conn)
+    logger.info(f"✅ {FTS_TABLE} (FTS5 trigram, noyob qiymatlar) yaratildi")
+    return True
+
+
+def sync_search_terms(conn):
+    """trade_records dagi barcha noyob qiymatlarni indeksga qo'shish (ustun indeksi bo'yicha skan)"""
+    for column in SEARCH_COLUMNS:
+        conn.execute(text(
+            f"INSERT OR IGNORE INTO {TERMS_TABLE} (field, value) "
+            f"SELECT DISTINCT :field, {column} FROM {TradeRecord.__tablename__} WHERE {column} IS NOT NULL"
+        ), {"field": column})
+
+
+def index_batch_terms(columns: dict):
+    """Import batch i commit bo'lgandan keyin - yangi qiymatlarni FTS5 indeksiga qo'shish (alohida qisqa tranzaksiya)"""
+    if get_search_backend() != "fts5":
+        return
+    terms = [
+        {"field": column, "value": value}
+        for column in SEARCH_COLUMNS
+        for value in set(columns.get(column, ()))
+        if value
+    ]
+    if not terms:
+        return
+    with get_writer_engine().begin() as conn:
+        conn.execute(text(f"INSERT OR IGNORE INTO {TERMS_TABLE} (field, value) VALUES (:field, :value)"), terms)
+
+
+def clear_search_terms(conn):
+    """Barcha ma'lumot o'chirilganda qidiruv qiymatlarini ham tozalash"""
+    if get_search_backend() != "fts5":
+        return
+    conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')"))
+    conn.execute(text(f"DELETE FROM {TERMS_TABLE}"))
+
+
+def _ensure_fulltext(create: bool = True) -> bool:
+    """MySQL: har bir ustunga ngram parser li FULLTEXT indeks"""
+    table = TradeRecord.__tablename__
+    engine = get_engine()
+    existing = {index['name'] for index in inspect(engine).get_indexes(table)}
+    if not create:
+        return all(f"ft_{table}_{column}" in existing for column in SEARCH_COLUMNS)
+
+    with engine.begin() as conn:
+        for column in SEARCH_COLUMNS:
+            name = f"ft_{table}_{column}"
+            if name in existing:
+                continue
+            conn.execute(text(f"ALTER TABLE {table} ADD FULLTEXT INDEX {name} ({column}) WITH PARSER ngram"))
+            logger.info(f"✅ {name} (FULLTEXT ngram) yaratildi")
+    return True
+
+
+def contains_ci(column, term: str):
+    """Katta-kichik harfsiz substring moslik, % va _ oddiy belgi sifatida (FTS5 trigram bilan bir xil)
+
+    SQLite LIKE faqat ASCII harflarni tenglashtiradi - ikkala tomon casefold() UDF orqali.
+    """
+    if get_db_type() == "sqlite":
+        return func.casefold(column).contains(term.casefold(), autoescape=True)
+    return column.icontains(term, autoescape=True)
+
+
+def substring_filter(column, term: str):
+    """Katta-kichik harfsiz substring filtri - imkoni bo'lsa matn indeksi orqali, qisqa so'zlarda ham bir xil natija"""
+    like = contains_ci(column, term)
+    search_backend = get_search_backend()
+    if search_backend == "dimension":
+        if column.key not in DIMENSION_SEARCH:
+            return like
+        fact_column, dim_column = DIMENSION_SEARCH[column.key]
+        dim_ids = select(dim_column.class_.id).where(contains_ci(dim_column, term))
+        return literal_column(f"{TradeRecord.__tablename__}.{fact_column}").in_(dim_ids)
+    
+    if search_backend is None or len(term) < MIN_TERM_LENGTH[search_backend]:
+        return like
+
+    param = f"search_{column.key}"
+
+    if search_backend == "fts5":
+        # Trigram phrase - katta-kichik harfsiz substring moslik; indeks mos qiymatlarni beradi,
+        # qatorlar ustun indeksi orqali (column IN (...)) olinadi
+        phrase = '"' + term.replace('"', '""') + '"'
+        field_param = f"{param}_field"
+        matches = text(
+            f"SELECT value FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :{param} AND field = :{field_param}"
+        ).bindparams(**{param: f"value : {phrase}", field_param: column.key})
+        return column.in_(matches.columns(sql_column('value', String)))
+
+    # ngram phrase nomzodlarni indeksdan topadi, LIKE aniq substring ni tekshiradi
+    phrase = '"' + term.replace('"', ' ') + '"'
+    return and_(
+        text(f"MATCH({column.key}) AGAINST (:{param} IN BOOLEAN MODE)").bindparams(**{param: phrase}),
+        like
+    )
@@ -0,0 +1,99 @@
+"""insert_batch uchun batch tayyorlash micro-benchmark
+
+Eski usul (to_dict('records') + har bir katakni tekshirish) va yangi
+ustunli usul (build_batch_columns + tuple) ni solishtiradi.
+
+    python -m benchmarks.bench_batch_prepare --rows 20000 --repeat 5
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.excel_processor import ExcelProcessor
+
+
+def make_batch(rows: int) -> pd.DataFrame:
+    """Tozalangan (clean_data dan o'tgan) batch ga o'xshash DataFrame"""
+    rng = np.random.default_rng(42)
+    hs_10 = rng.integers(10**9, 10**10 - 1, rows).astype(str)
+    df = pd.DataFrame({
+        'hs_2_code': [c[:2] for c in hs_10],
+        'hs_4_code': [c[:4] for c in hs_10],
+        'hs_6_code': [c[:6] for c in hs_10],
+        'hs_10_code': hs_10,
+        'product_name': np.array([f"Product {i % 5000}" for i in range(rows)], dtype=object),
+        'measure': rng.choice(['Тонна', 'Штука', 'Литр', ''], rows),
+        'export_volume': rng.random(rows) * 1000,
+        'export_price': rng.random(rows) * 1000,
+        'import_volume': rng.random(rows) * 1000,
+        'import_price': rng.random(rows) * 1000,
+        'trading_partner': rng.choice(['Afghanistan', 'China', 'Russia', 'Turkey'], rows),
+        'year': rng.integers(2000, 2025, rows),
+        'hs_group': rng.choice(['Vegetable products', 'Machinery', ''], rows),
+    })
+    # Bo'sh qiymatlar
+    df.loc[df.sample(frac=0.1, random_state=1).index, 'import_volume'] = np.nan
+    df.loc[df.sample(frac=0.1, random_state=2).index, 'hs_group'] = np.nan
+    return df
+
+
+def legacy_prepare(batch_df: pd.DataFrame) -> list:
+    """Eski insert_batch dagi per-cell tozalash"""
+    records = batch_df.to_dict('records')
+    clean_records = []
+    for record in records:
+        clean_record = {}
+        for key, value in record.items():
+            if pd.isna(value) or str(value).strip() == '' or str(value) == 'nan':
+                if key in ['export_volume', 'export_price', 'import_volume', 'import_price', 'year']:
+                    clean_record[key] = 0
+                else:
+                    clean_record[key] = ''
+            else:
+                clean_record[key] = value
+        clean_records.append(clean_record)
+    return clean_records
+
+
+def columnar_prepare(processor: ExcelProcessor, batch_df: pd.DataFrame) -> list:
+    columns = processor.build_batch_columns(batch_df)
+    return list(zip(*columns.values()))
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    processor = ExcelProcessor()
+    batch = make_batch(args.rows)
+
+    # Natijalar bir xil ekanini tekshirish
+    legacy = legacy_prepare(batch)
+    columns = processor.build_batch_columns(batch)
+    for key in batch.columns:
+        assert [r[key] for r in legacy] == columns[key], key
+
+    legacy_time = best_of(lambda: legacy_prepare(batch), args.repeat)
+    columnar_time = best_of(lambda: columnar_prepare(processor, batch), args.repeat)
+
+    print(f"Qatorlar:     {args.rows:,}")
+    print(f"Eski usul:    {legacy_time * 1000:8.1f} ms  ({args.rows / legacy_time:,.0f} qator/s)")
+    print(f"Ustunli usul: {columnar_time * 1000:8.1f} ms  ({args.rows / columnar_time:,.0f} qator/s)")
+    print(f"Tezlashish:   {legacy_time / columnar_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Parallel so'rovlar benchmarki - og'ir so'rovlar paytida yengil endpointlar kechikishi
+
+Vaqtinchalik SQLite database ni sintetik ma'lumot bilan to'ldiradi, ilovani
+alohida uvicorn process da ishga tushiradi va ikki o'lchov qiladi:
+
+1. Bo'sh server: yengil endpointlar (/api/data-version, /api/filter-options,
+   /api/products/suggest) ketma-ket - p50/p95/p99/max kechikish.
+2. Yuklama ostida: --heavy-clients ta thread to'xtovsiz og'ir so'rov yuboradi
+   (/api/aggregate, /api/duplicate-stats, /api/trade-data), shu paytda yana
+   yengil endpointlar o'lchanadi.
+
+Event loop to'silsa, 2-bosqichdagi p99 og'ir so'rov davomiyligiga yaqinlashadi.
+
+--import-rows berilsa, 3-bosqich: /upload-excel orqali import ketayotganda
+database dan o'qiydigan endpointlar (/api/trade-data, /stats) kechikishi.
+SQLite da WAL (SQLITE_JOURNAL_MODE) o'quvchilarni yozuvchidan ajratadi.
+
+    python -m benchmarks.bench_concurrency --rows 200000
+    python -m benchmarks.bench_concurrency --rows 500000 --heavy-clients 16
+    python -m benchmarks.bench_concurrency --rows 100000 --import-rows 300000
+    SQLITE_JOURNAL_MODE=DELETE python -m benchmarks.bench_concurrency --import-rows 300000
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+LIGHT_REQUESTS = [
+    ("GET", "/api/data-version", None),
+    ("GET", "/api/filter-options", None),
+    ("GET", "/api/products/suggest?q=pro&limit=20", None),
+]
+
+HEAVY_REQUESTS = [
+    ("POST", "/api/aggregate", urlencode([("group_by", "product"), ("group_by", "year")])),
+    ("GET", "/api/duplicate-stats", None),
+    ("GET", "/api/trade-data?country=a&limit=5000", None),
+]
+
+# Import paytida o'lchanadigan, database ga murojaat qiladigan endpointlar
+READ_REQUESTS = [
+    ("GET", "/api/trade-data?limit=100", None),
+    ("GET", "/stats", None),
+]
+
+FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request(conn: http.client.HTTPConnection, method: str, path: str, body=None) -> float:
+    """Bitta so'rov (keep-alive ulanishda) - soniyalardagi davomiyligi"""
+    t0 = time.perf_counter()
+    conn.request(method, path, body=body, headers=FORM_HEADERS if body else {})
+    response = conn.getresponse()
+    response.read()
+    if response.status >= 400:
+        raise RuntimeError(f"{method} {path}: HTTP {response.status}")
+    return time.perf_counter() - t0
+
+
+def percentiles(samples: list) -> dict:
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": ordered[-1] * 1000}
+
+
+def measure_light(port: int, count: int, requests=LIGHT_REQUESTS) -> list:
+    """Yengil endpointlarni navbatma-navbat count marta so'rash"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    samples = []
+    for i in range(count):
+        method, path, body = requests[i % len(requests)]
+        samples.append(request(conn, method, path, body))
+        time.sleep(0.005)
+    conn.close()
+    return samples
+
+
+def upload_file(port: int, file_path: str) -> str:
+    """Faylni /upload-excel ga multipart bilan yuborish - import job id si"""
+    boundary = "bench-boundary"
+    with open(file_path, "rb") as f:
+        content = f.read()
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{os.path.basename(file_path)}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+    conn.request("POST", "/upload-excel", body=body,
+                 headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+    result = json.loads(conn.getresponse().read())
+    conn.close()
+    if not result.get("job_id"):
+        raise RuntimeError(f"Upload xatolik: {result}")
+    return result["job_id"]
+
+
+def measure_during_import(port: int, file_path: str) -> tuple:
+    """Import tugaguncha database o'quvchi endpointlarni so'rash"""
+    job_id = upload_file(port, file_path)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+    samples = []
+    t0 = time.perf_counter()
+    while True:
+        conn.request("GET", f"/api/import-jobs/{job_id}")
+        job = json.loads(conn.getresponse().read())
+        if job.get("status") not in ("queued", "running"):
+            break
+        samples.extend(measure_light(port, len(READ_REQUESTS), READ_REQUESTS))
+    conn.close()
+    return samples, job, time.perf_counter() - t0
+
+
+def heavy_client(port: int, stop: threading.Event, durations: list, offset: int):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+    i = offset
+    while not stop.is_set():
+        method, path, body = HEAVY_REQUESTS[i % len(HEAVY_REQUESTS)]
+        durations.append(request(conn, method, path, body))
+        i += 1
+    conn.close()
+
+
+def populate(rows: int, workdir: str):
+    """Sintetik CSV ni ExcelProcessor orqali import qilish"""
+    from app.excel_processor import ExcelProcessor
+    from app.schema import init_database
+    from benchmarks.synthetic import write_file
+
+    init_database()
+
+    file_path = os.path.join(workdir, f"synthetic_{rows}.csv")
+    write_file(file_path, rows)
+    result = asyncio.run(ExcelProcessor().process_file(file_path))
+    if not result.get("success"):
+        raise RuntimeError(result.get("error"))
+    return result.get("inserted_records", 0)
+
+
+def start_server(port: int, env: dict) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            request(http.client.HTTPConnection("127.0.0.1", port, timeout=5), "GET", "/api/data-version")
+            return server
+        except (OSError, RuntimeError, http.client.HTTPException):
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn ishga tushmadi")
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("uvicorn javob bermadi")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000, help="sintetik qatorlar soni")
+    parser.add_argument('--heavy-clients', type=int, default=8, help="og'ir so'rov yuboradigan threadlar")
+    parser.add_argument('--light-requests', type=int, default=300, help="har bosqichdagi yengil so'rovlar")
+    parser.add_argument('--import-rows', type=int, default=0, help="import paytidagi o'qish bosqichi uchun qatorlar")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="trade_bench_")
+    # app.database import qilinishidan oldin - vaqtinchalik SQLite
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    import logging
+    logging.disable(logging.INFO)
+
+    t0 = time.perf_counter()
+    inserted = populate(args.rows, workdir)
+    print(f"📦 {inserted:,} qator import qilindi ({time.perf_counter() - t0:.1f} s)")
+
+    import_file = None
+    if args.import_rows:
+        from benchmarks.synthetic import write_file
+        import_file = write_file(os.path.join(workdir, f"import_{args.import_rows}.csv"), args.import_rows, seed=7)
+
+    port = free_port()
+    server = start_server(port, dict(os.environ))
+    try:
+        # Snapshot va birinchi so'rov xarajatlari o'lchovga tushmasligi uchun
+        measure_light(port, len(LIGHT_REQUESTS))
+        idle = measure_light(port, args.light_requests)
+
+        stop = threading.Event()
+        durations = []
+        clients = [
+            threading.Thread(target=heavy_client, args=(port, stop, durations, i), daemon=True)
+            for i in range(args.heavy_clients)
+        ]
+        for client in clients:
+            client.start()
+        time.sleep(0.5)
+        loaded = measure_light(port, args.light_requests)
+        stop.set()
+        for client in clients:
+            client.join()
+
+        if import_file:
+            during_import, job, import_seconds = measure_during_import(port, import_file)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"\n{'Bosqich':<14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, samples in (("bo'sh", idle), ("yuklama", loaded)):
+        stats = percentiles(samples)
+        print(f"{name:<14}{stats['p50']:>10.1f}{stats['p95']:>10.1f}{stats['p99']:>10.1f}{stats['max']:>10.1f}")
+
+    heavy = percentiles(durations)
+    print(f"\nOg'ir so'rovlar: {len(durations)} ta, {args.heavy_clients} thread, "
+          f"p50 {heavy['p50']:.0f} ms, max {heavy['max']:.0f} ms")
+
+    if import_file:
+        print(f"\nImport paytida o'qish ({job.get('status')}, {import_seconds:.1f} s, "
+              f"{len(during_import)} so'rov):")
+        if during_import:
+            stats = percentiles(during_import)
+            print(f"{'import':<14}{stats['p50']:>10.1f}{stats['p95']:>10.1f}{stats['p99']:>10.1f}{stats['max']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
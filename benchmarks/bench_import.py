@@ -0,0 +1,158 @@
+"""ExcelProcessor import benchmarki - vaqtinchalik SQLite database da
+
+Sintetik fayl yaratadi (yoki --file dan oladi) va ikki o'lchov qiladi:
+
+1. Bosqichlar alohida: har bir bo'lak uchun o'qish, clean_data va
+   insert_batch ketma-ket - har bosqichning qator/s va eng yuqori RSS i.
+2. To'liq import: ExcelProcessor.process_file (pipeline) - umumiy qator/s
+   va eng yuqori RSS.
+
+    python -m benchmarks.bench_import --rows 100000
+    python -m benchmarks.bench_import --rows 1000000 --format csv
+    python -m benchmarks.bench_import --file /data/customs_2024.xlsx
+"""
+import argparse
+import asyncio
+import os
+import resource
+import tempfile
+import threading
+import time
+
+
+class RSSSampler:
+    """Joriy bosqich uchun eng yuqori RSS (MB) ni fon thread ida o'lchash"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.stage = None
+        self.peaks = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def current_rss_mb() -> float:
+        try:
+            with open('/proc/self/statm') as f:
+                pages = int(f.read().split()[1])
+            return pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+        except OSError:
+            # /proc yo'q (macOS) - process davomidagi maksimum
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        if self.stage:
+            rss = self.current_rss_mb()
+            self.peaks[self.stage] = max(self.peaks.get(self.stage, 0), rss)
+
+    def set_stage(self, stage):
+        self.sample()
+        self.stage = stage
+        self.sample()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_stages(processor, file_path: str, sampler: RSSSampler) -> dict:
+    """O'qish, tozalash va yozishni bo'lak-bo'lak, alohida o'lchash"""
+    stages = {name: {"rows": 0, "seconds": 0.0} for name in ("read", "clean", "insert")}
+    chunks = processor.iter_file_chunks(file_path, processor.batch_size)
+    batch_num = 0
+
+    while True:
+        sampler.set_stage("read")
+        t0 = time.perf_counter()
+        chunk = next(chunks, None)
+        stages["read"]["seconds"] += time.perf_counter() - t0
+        if chunk is None:
+            break
+        stages["read"]["rows"] += len(chunk)
+
+        sampler.set_stage("clean")
+        t0 = time.perf_counter()
+        chunk = processor.clean_data(chunk)
+        stages["clean"]["seconds"] += time.perf_counter() - t0
+        stages["clean"]["rows"] += len(chunk)
+
+        sampler.set_stage("insert")
+        batch_num += 1
+        t0 = time.perf_counter()
+        stages["insert"]["rows"] += processor.insert_batch(chunk, batch_num)
+        stages["insert"]["seconds"] += time.perf_counter() - t0
+
+    sampler.set_stage(None)
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000, help="sintetik qatorlar soni (10k - 5M)")
+    parser.add_argument('--format', choices=['xlsx', 'csv', 'parquet'], default='xlsx')
+    parser.add_argument('--file', help="sintetik o'rniga mavjud fayl")
+    parser.add_argument('--batch-size', type=int, default=20000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="trade_bench_")
+    # app.database import qilinishidan oldin - vaqtinchalik SQLite
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    import logging
+    logging.disable(logging.INFO)
+
+    from app.database import get_engine, TradeRecord
+    from app.excel_processor import ExcelProcessor
+    from app.schema import init_database
+    from benchmarks.synthetic import write_file
+
+    file_path = args.file
+    if not file_path:
+        file_path = os.path.join(workdir, f"synthetic_{args.rows}.{args.format}")
+        t0 = time.perf_counter()
+        write_file(file_path, args.rows)
+        print(f"📄 Sintetik fayl: {file_path} ({time.perf_counter() - t0:.1f} s)")
+    print(f"📦 Fayl hajmi: {os.path.getsize(file_path) / 1024 / 1024:.1f} MB")
+
+    init_database()
+    engine = get_engine()
+    processor = ExcelProcessor()
+    processor.batch_size = args.batch_size
+
+    with RSSSampler() as sampler:
+        baseline = sampler.current_rss_mb()
+        stages = run_stages(processor, file_path, sampler)
+
+        # To'liq pipeline - toza jadvalda (row_hash dublikat sifatida o'tkazmasligi uchun)
+        with engine.begin() as conn:
+            conn.execute(TradeRecord.__table__.delete())
+        sampler.set_stage("pipeline")
+        t0 = time.perf_counter()
+        result = asyncio.run(processor.process_file(file_path))
+        pipeline_seconds = time.perf_counter() - t0
+        sampler.set_stage(None)
+
+    print(f"\n{'Bosqich':<10}{'Qatorlar':>12}{'Soniya':>10}{'Qator/s':>12}{'Peak RSS MB':>14}")
+    for name, stage in stages.items():
+        rate = stage["rows"] / stage["seconds"] if stage["seconds"] else 0
+        print(f"{name:<10}{stage['rows']:>12,}{stage['seconds']:>10.2f}{rate:>12,.0f}"
+              f"{sampler.peaks.get(name, 0):>14.1f}")
+
+    rows = result.get("inserted_records", 0)
+    print(f"{'pipeline':<10}{rows:>12,}{pipeline_seconds:>10.2f}{rows / pipeline_seconds:>12,.0f}"
+          f"{sampler.peaks.get('pipeline', 0):>14.1f}")
+    print(f"\nBoshlang'ich RSS: {baseline:.1f} MB, database: {engine.url.database}")
+    if not result.get("success"):
+        print(f"❌ Pipeline xatolik: {result.get('error')}")
+
+
+if __name__ == "__main__":
+    main()
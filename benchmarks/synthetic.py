@@ -0,0 +1,173 @@
+"""Import benchmarklari uchun sintetik savdo fayli generatori
+
+Ustun nomlari ExcelProcessor.COLUMN_MAPPING bilan bir xil. Hamkor davlatlar
+va HS kodlar real ma'lumotlarga o'xshab notekis (Zipf) taqsimlangan.
+
+    python -m benchmarks.synthetic --rows 100000 --out /tmp/trade_100k.xlsx
+    python -m benchmarks.synthetic --rows 5000000 --out /tmp/trade_5m.csv
+
+.xlsx da bir varaq 1 048 575 qatordan oshsa, qolgan qatorlar keyingi
+varaqlarga yoziladi.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Excel da bitta varaqdagi maksimal ma'lumot qatorlari (sarlavhadan tashqari)
+EXCEL_MAX_ROWS = 1048575
+
+HEADERS = [
+    '2 HS code', '4 HS code', '6 HS code', '10 HS code', 'Product name', 'Measure',
+    'Export volume', 'Export price (1000 USD)', 'Import volume', 'Import price (1000 USD)',
+    'Trading partner', 'Year', 'HS Group'
+]
+
+COUNTRIES = [
+    'China', 'Russia', 'Kazakhstan', 'Turkey', 'Korea, Republic of', 'Germany', 'Kyrgyzstan',
+    'Afghanistan', 'Tajikistan', 'Turkmenistan', 'India', 'United States', 'Iran', 'Belarus',
+    'Ukraine', 'Japan', 'Italy', 'France', 'Latvia', 'Lithuania', 'Poland', 'Brazil',
+    'United Arab Emirates', 'Pakistan', 'Azerbaijan', 'Georgia', 'Netherlands', 'Switzerland',
+]
+
+MEASURES = ['Тонна', 'Штука', 'Литр', 'Килограмм', 'Пара', 'Кубический метр', '']
+
+HS_GROUPS = [
+    'Live animals', 'Vegetable products', 'Animal or vegetable fats', 'Prepared foodstuffs',
+    'Mineral products', 'Chemical products', 'Plastics and rubber', 'Hides and skins',
+    'Wood products', 'Paper products', 'Textiles', 'Footwear', 'Stone and glass',
+    'Precious metals', 'Base metals', 'Machinery', 'Transport equipment', 'Instruments',
+    'Arms and ammunition', 'Miscellaneous manufactured articles', 'Works of art',
+]
+
+WORDS = [
+    'прочие', 'свежие', 'охлажденные', 'мороженые', 'сушеные', 'нелущеный', 'дробленый',
+    'из хлопка', 'для промышленной сборки', 'массой более', 'не более', 'кг', 'новые',
+    'бывшие в употреблении', 'с двигателем', 'электрические', 'в первичных формах',
+]
+
+
+def zipf_choice(rng, n_items: int, size: int, a: float = 1.3) -> np.ndarray:
+    """0..n_items-1 oralig'ida notekis (Zipf) indekslar"""
+    ranks = np.arange(1, n_items + 1)
+    weights = 1.0 / ranks ** a
+    return rng.choice(n_items, size=size, p=weights / weights.sum())
+
+
+def make_dimensions(rng, partners: int, products: int):
+    """Hamkorlar va HS-10 mahsulotlar lug'atlari"""
+    partner_names = COUNTRIES[:partners] + [
+        f"Country {i:03d}" for i in range(max(partners - len(COUNTRIES), 0))
+    ]
+
+    hs2 = rng.integers(1, 98, products)
+    hs10 = np.unique(hs2 * 10**8 + rng.integers(0, 10**8, products))
+    codes = np.array([f"{c:010d}" for c in hs10])
+    names = np.array([
+        f"Товар {code[:6]}: " + ', '.join(rng.choice(WORDS, rng.integers(3, 12)))
+        for code in codes
+    ], dtype=object)
+    groups = np.array([HS_GROUPS[int(code[:2]) % len(HS_GROUPS)] for code in codes], dtype=object)
+    measures = rng.choice(MEASURES, len(codes))
+    return np.array(partner_names, dtype=object), codes, names, groups, measures
+
+
+def generate_frame(rows: int, partners: int = 230, products: int = 12000,
+                   years=(2000, 2024), seed: int = 42, chunk_rows: int = 200000):
+    """Sintetik ma'lumotni chunk_rows qatorli DataFrame bo'laklari sifatida berish"""
+    rng = np.random.default_rng(seed)
+    partner_names, codes, names, groups, measures = make_dimensions(rng, partners, products)
+
+    for start in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - start)
+        p_idx = zipf_choice(rng, len(partner_names), n)
+        h_idx = zipf_choice(rng, len(codes), n, a=1.05)
+        hs10 = codes[h_idx]
+
+        export_volume = np.round(rng.lognormal(5, 2, n), 3)
+        import_volume = np.round(rng.lognormal(5, 2, n), 3)
+        # Har qatorda faqat eksport yoki import bo'lishi mumkin
+        only_export = rng.random(n) < 0.3
+        only_import = ~only_export & (rng.random(n) < 0.3)
+
+        frame = pd.DataFrame({
+            '2 HS code': pd.Series(hs10).str[:2],
+            '4 HS code': pd.Series(hs10).str[:4],
+            '6 HS code': pd.Series(hs10).str[:6],
+            '10 HS code': hs10,
+            'Product name': names[h_idx],
+            'Measure': measures[h_idx],
+            'Export volume': np.where(only_import, np.nan, export_volume),
+            'Export price (1000 USD)': np.where(only_import, np.nan, np.round(export_volume * rng.random(n), 3)),
+            'Import volume': np.where(only_export, np.nan, import_volume),
+            'Import price (1000 USD)': np.where(only_export, np.nan, np.round(import_volume * rng.random(n), 3)),
+            'Trading partner': partner_names[p_idx],
+            'Year': rng.integers(years[0], years[1] + 1, n),
+            'HS Group': groups[h_idx],
+        }, columns=HEADERS)
+        yield frame
+
+
+def write_file(out: str, rows: int, **kwargs) -> str:
+    """Sintetik faylni .xlsx, .csv yoki .parquet formatda yozish"""
+    ext = os.path.splitext(out)[1].lower()
+    frames = generate_frame(rows, **kwargs)
+
+    if ext == '.csv':
+        for i, frame in enumerate(frames):
+            frame.to_csv(out, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+
+    elif ext == '.parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for frame in frames:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                writer = writer or pq.ParquetWriter(out, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer:
+                writer.close()
+
+    elif ext == '.xlsx':
+        import openpyxl
+
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet, sheet_rows = None, EXCEL_MAX_ROWS
+        for frame in frames:
+            for row in frame.itertuples(index=False):
+                if sheet_rows >= EXCEL_MAX_ROWS:
+                    sheet = workbook.create_sheet(f"Sheet{len(workbook.worksheets) + 1}")
+                    sheet.append(HEADERS)
+                    sheet_rows = 0
+                sheet.append([None if isinstance(v, float) and v != v else v for v in row])
+                sheet_rows += 1
+        workbook.save(out)
+
+    else:
+        raise ValueError(f"Qo'llab-quvvatlanmaydigan format: {ext}")
+
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000, help="qatorlar soni (10k - 5M)")
+    parser.add_argument('--out', required=True, help=".xlsx, .csv yoki .parquet")
+    parser.add_argument('--partners', type=int, default=230)
+    parser.add_argument('--products', type=int, default=12000, help="HS-10 kodlar soni")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    write_file(args.out, args.rows, partners=args.partners, products=args.products, seed=args.seed)
+    size_mb = os.path.getsize(args.out) / 1024 / 1024
+    print(f"✅ {args.out}: {args.rows:,} qator, {size_mb:.1f} MB, {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
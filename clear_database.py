@@ -1,13 +1,13 @@
 from app.database import SessionLocal, TradeRecord
+from app import maintenance
 import os
 
 def clear_all_data():
     """Barcha ma'lumotlarni o'chirish"""
     db = SessionLocal()
     try:
-        # Barcha recordlarni o'chirish
-        deleted_count = db.query(TradeRecord).delete()
-        db.commit()
+        # Barcha recordlarni o'chirish (/clear-data bilan bir xil: rollup, dedupe, data_version)
+        deleted_count = maintenance.clear_all_data(db)
         
         print(f"✅ {deleted_count:,} ta record o'chirildi")
         print("✅ Database tozalandi!")
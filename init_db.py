@@ -0,0 +1,20 @@
+"""Database sxemasini yaratish/yangilash - deploy qadami
+
+Ilova startida sxema yaratilmaydi (DB_AUTO_INIT standart o'chiq), shuning uchun har deploy dan
+oldin production database ga qarshi ishga tushiriladi:
+
+    DATABASE_URL=mysql+pymysql://... STORAGE_MODE=flat python init_db.py
+    vercel deploy --prod
+
+Skript idempotent: jadvallar, VIEW, indekslar, qidiruv indeksi va rollup lar faqat yo'q bo'lsa
+yaratiladi. Lokal `python run.py` buni startda o'zi bajaradi.
+"""
+from app.database import get_database_info
+from app.schema import init_database
+
+if __name__ == "__main__":
+    print("🔧 Database sxemasi tayyorlanmoqda...")
+    init_database()
+    
+    info = get_database_info()
+    print(f"✅ {info['type']} ({info['storage_mode']}): {info['url']}")
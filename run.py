@@ -1,4 +1,10 @@
+import os
+
 import uvicorn
+
+# Lokal ishga tushirishda sxema startda yaratiladi (deploy da - init_db.py)
+os.environ.setdefault("DB_AUTO_INIT", "1")
+
 from app.main import app
 
 if __name__ == "__main__":